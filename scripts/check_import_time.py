@@ -0,0 +1,98 @@
+"""
+Check the import cost of the command-line entry points.
+
+Each module is imported in a fresh interpreter. The check fails if a module
+loads a library it is not allowed to load at import time, or if its best
+import time over several runs exceeds its budget.
+
+Usage: python scripts/check_import_time.py [--repeat N] [--scale FACTOR]
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY = ("pandas", "numpy", "plotly", "uvicorn", "scipy", "sklearn", "statsmodels", "matplotlib")
+
+# module -> (budget in ms, libraries it must not import)
+BUDGETS = {
+    "src.api": (800, ("pandas", "numpy", "plotly", "uvicorn")),
+    "src.worker": (100, ("pandas", "numpy")),
+    "src.run_services": (100, HEAVY),
+    "src.nightly": (100, ("pandas", "numpy")),
+    # Library loaded by the entry points once there is a file to process
+    "src.pipeline": (1500, ("plotly", "uvicorn", "fastapi", "streamlit", "scipy", "sklearn", "statsmodels")),
+    "src.dashboard": (3000, ("plotly",)),
+}
+
+# module -> optional libraries; the module is skipped if one is not installed
+OPTIONAL = {
+    "src.dashboard": ("streamlit",),
+}
+
+MISSING_MODULE = re.compile(r"ModuleNotFoundError: No module named '([\w.]+)'")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module):
+    """Import a module in a fresh interpreter; return (ms, loaded top-level modules)."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data["ms"], {name.split(".")[0] for name in data["modules"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply budgets, e.g. for slow CI hosts")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: all entry points)")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules or BUDGETS:
+        budget, forbidden = BUDGETS[module]
+        try:
+            runs = [measure(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            # Only a missing optional library is a reason to skip; any other
+            # import error is a failure
+            missing = MISSING_MODULE.search(str(e))
+            if missing and missing.group(1).split(".")[0] in OPTIONAL.get(module, ()):
+                print(f"SKIP {module}: {missing.group(1)} is not installed")
+                continue
+            print(f"FAIL {module}: {e}")
+            failed = True
+            continue
+
+        best = min(ms for ms, _ in runs)
+        loaded = sorted(set(forbidden) & runs[0][1])
+        limit = budget * args.scale
+        ok = best <= limit and not loaded
+        failed |= not ok
+        status = "ok  " if ok else "FAIL"
+        print(f"{status} {module}: {best:.0f} ms (budget {limit:.0f} ms)")
+        if loaded:
+            print(f"     imports {', '.join(loaded)} at import time")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Check that incrementally computed market indicators match a full recompute.
+
+Market files are run through the pipeline one after another in a temporary
+data directory, the way uploads arrive: sequential files, inclusive exports
+that repeat the last date, overlapping files, resends, a full restart and
+several series (by filename and by ``symbol`` column). After each file its
+indicator columns are compared with the indicators computed over the whole
+series in one pass. A file that starts inside already-processed history too
+far back to rewind must be refused with OverlapError.
+
+Usage: python scripts/check_indicators.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def make_series(days, seed, start="2024-01-01"):
+    """Random-walk prices on consecutive days."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=days, freq="D"),
+        "price": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days))),
+    })
+
+
+def run_checks(data_dir):
+    """Run every scenario in ``data_dir``; return the failure messages."""
+    import numpy as np
+    import pandas as pd
+
+    from src.indicators import OverlapError, compute_indicators, indicator_columns
+    from src.pipeline import process_file
+
+    raw_dir = Path(data_dir) / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    columns = indicator_columns()
+    failures = []
+    uploads = 0
+
+    def expected(full):
+        """Indicators over each whole series, indexed by (series, date)."""
+        frames = []
+        for series, rows in full.groupby("symbol", sort=False):
+            values, _ = compute_indicators(rows["date"], rows["price"])
+            frame = pd.DataFrame(values)
+            frame["symbol"] = series
+            frame["date"] = rows["date"].to_numpy()
+            frames.append(frame)
+        return pd.concat(frames).set_index(["symbol", "date"])
+
+    def upload(rows, series, with_symbol=False):
+        nonlocal uploads
+        uploads += 1
+        path = raw_dir / f"market_{series}_{uploads:04d}.csv"
+        rows.drop(columns=[] if with_symbol else ["symbol"]).to_csv(path, index=False)
+        return process_file(path, "market")
+
+    def check(name, rows, series, full, with_symbol=False):
+        try:
+            out = upload(rows, series, with_symbol)
+        except Exception as e:
+            failures.append(f"{name}: {type(e).__name__}: {e}")
+            print(f"FAIL {name}: {type(e).__name__}: {e}")
+            return
+        symbols = out["symbol"] if with_symbol else pd.Series(series, index=out.index)
+        want = expected(full).loc[list(zip(symbols, out["date"]))]
+        bad = [
+            column for column in columns
+            if not np.allclose(out[column].to_numpy(float), want[column].to_numpy(float), equal_nan=True)
+        ]
+        if bad:
+            failures.append(f"{name}: {', '.join(bad)} differ from a full recompute")
+        print(f"{'FAIL' if bad else 'ok  '} {name}")
+
+    def check_refused(name, rows, series):
+        try:
+            upload(rows, series)
+        except OverlapError:
+            print(f"ok   {name}")
+            return
+        except Exception as e:
+            failures.append(f"{name}: expected OverlapError, got {type(e).__name__}: {e}")
+        else:
+            failures.append(f"{name}: expected OverlapError, file was accepted")
+        print(f"FAIL {name}")
+
+    alpha = make_series(100, seed=1).assign(symbol="alpha")
+    check("first file", alpha.iloc[0:40], "alpha", alpha)
+    check("inclusive export repeating the last date", alpha.iloc[39:70], "alpha", alpha)
+    check("overlap within the stored tail", alpha.iloc[65:100], "alpha", alpha)
+    check("resend from a checkpoint", alpha.iloc[39:100], "alpha", alpha)
+    check("full restart", alpha.iloc[0:100], "alpha", alpha)
+    check_refused("file starting inside processed history", alpha.iloc[20:60], "alpha")
+
+    # A second series must not inherit alpha's state, whatever its dates
+    beta = make_series(60, seed=2, start="2024-02-15").assign(symbol="beta")
+    check("independent series starting partway", beta.iloc[0:30], "beta", beta)
+    check("independent series continued", beta.iloc[30:60], "beta", beta)
+
+    # Series told apart by a symbol column inside one file
+    both = pd.concat([
+        make_series(50, seed=3).assign(symbol="gamma"),
+        make_series(50, seed=4, start="2024-01-10").assign(symbol="delta"),
+    ])
+    first = both.groupby("symbol").head(25).sort_values("date", kind="stable")
+    rest = pd.concat([rows.iloc[24:] for _, rows in both.groupby("symbol", sort=False)])
+    rest = rest.sort_values("date", kind="stable")
+    check("symbol column, first file", first, "mixed", both, with_symbol=True)
+    check("symbol column, overlapping file", rest, "mixed", both, with_symbol=True)
+
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="flsd-check-") as data_dir:
+        # Set before the pipeline is imported; it resolves paths from here
+        os.environ["FLSD_DATA_DIR"] = data_dir
+        sys.path.insert(0, str(ROOT))
+        failures = run_checks(data_dir)
+
+    if failures:
+        print("\n".join(["", *failures]))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
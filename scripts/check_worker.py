@@ -0,0 +1,122 @@
+"""
+Check the spool workers' leases, serial ordering and per-file options.
+
+Runs workers in-process against a spool in a temporary data directory:
+a live lease must not be taken over and an expired one must be, a worker
+that has lost its lease must leave the file and publish nothing, market
+files must be processed one at a time in spool order, and the policy
+stored with a file must override the worker's.
+
+Usage: python scripts/check_worker.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def market_csv(start_day, days, bad_row=False):
+    """Daily market rows as CSV bytes; ``bad_row`` adds a negative price."""
+    rows = ["date,price"]
+    for day in range(start_day, start_day + days):
+        rows.append(f"2024-{1 + day // 28:02d}-{1 + day % 28:02d},{100 + day * 0.5:.2f}")
+    if bad_row:
+        rows.append(f"2024-{1 + (start_day + days) // 28:02d}-{1 + (start_day + days) % 28:02d},-1")
+    return ("\n".join(rows) + "\n").encode()
+
+
+def run_checks(data_dir):
+    """Run every scenario in ``data_dir``; return the failure messages."""
+    from src.worker import DEFAULT_LEASE_TTL, Lease, _process, enqueue, process_next, spool_dirs
+
+    dirs = spool_dirs()
+    processed_dir = Path(data_dir) / "processed"
+    failures = []
+
+    def check(name, ok, detail=""):
+        if not ok:
+            failures.append(f"{name}{': ' + detail if detail else ''}")
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    def spooled(name):
+        """Return the spool subdirectory holding ``name``, if any."""
+        return next((sub for sub, path in dirs.items() if (path / name).exists()), None)
+
+    def backdate(path, seconds):
+        stamp = time.time() - seconds
+        os.utime(path, (stamp, stamp))
+
+    # Leases
+    ttl = DEFAULT_LEASE_TTL
+    first = Lease.acquire(dirs["leases"], "probe.csv", "w1", ttl)
+    check("first worker claims a free file", first is not None)
+    check("live lease is not taken over", Lease.acquire(dirs["leases"], "probe.csv", "w2", ttl) is None)
+    backdate(first.path, ttl + 30)
+    second = Lease.acquire(dirs["leases"], "probe.csv", "w2", ttl)
+    check("expired lease is reclaimed", second is not None)
+    check("reclaimed lease is lost to its old holder", not first.owned() and not first.heartbeat())
+    first.release()
+    check("old holder's release leaves the new lease", second is not None and second.owned())
+    if second is not None:
+        second.release()
+
+    # A worker that lost its lease publishes nothing and leaves the file
+    path = enqueue(market_csv(0, 30), "market_lost_0001.csv")
+    _process(path, dirs, "reject", owned=lambda: False)
+    check("lost lease leaves the file in incoming", spooled(path.name) == "incoming", spooled(path.name))
+    check("lost lease publishes no output", not list(processed_dir.glob("market_*")))
+    path.unlink()
+
+    # Market files go one at a time, oldest first
+    names = ["market_serial_0001.csv", "market_serial_0002.csv", "market_serial_0003.csv"]
+    for age, (name, start) in zip((300, 200, 100), zip(names, (0, 40, 80))):
+        backdate(enqueue(market_csv(start, 40), name), age)
+    holder = Lease.acquire(dirs["leases"], names[0], "w1", ttl)
+    claimed = process_next(dirs, "w2", "reject")
+    check("newer market file waits while the oldest is leased",
+          not claimed and spooled(names[1]) == "incoming")
+    holder.release()
+    for i, name in enumerate(names):
+        process_next(dirs, "w2", "reject")
+        waiting = all(spooled(later) == "incoming" for later in names[i + 1:])
+        check(f"{name} processed in spool order", spooled(name) == "done" and waiting,
+              f"found in {spooled(name)}")
+
+    # Rows starting inside the first file, beyond its stored tail, are the
+    # sender's to fix
+    overlap = "market_serial_0004.csv"
+    enqueue(market_csv(5, 40), overlap)
+    process_next(dirs, "w2", "reject")
+    check("overlapping market file is rejected, not failed", spooled(overlap) == "rejected", spooled(overlap))
+
+    # The policy stored with a file overrides the worker's
+    strict, lenient = "market_strict_0001.csv", "market_lenient_0001.csv"
+    backdate(enqueue(market_csv(0, 30, bad_row=True), strict), 20)
+    enqueue(market_csv(0, 30, bad_row=True), lenient, policy="quarantine")
+    process_next(dirs, "w2", "reject")
+    process_next(dirs, "w2", "reject")
+    check("worker policy rejects an invalid file", spooled(strict) == "rejected", spooled(strict))
+    check("file's own policy quarantines instead", spooled(lenient) == "done", spooled(lenient))
+    check("sidecar moves with its file", (dirs["done"] / f"{lenient}.json").exists())
+    check("quarantined rows are written", any((Path(data_dir) / "quarantine").glob("market_*")))
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="flsd-check-") as data_dir:
+        # Set before the worker is imported; it resolves paths from here
+        os.environ["FLSD_DATA_DIR"] = data_dir
+        sys.path.insert(0, str(ROOT))
+        failures = run_checks(data_dir)
+
+    if failures:
+        print("\n".join(["", *failures]))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,13 +25,17 @@ setup(
         "fastapi>=0.109.0",
         "uvicorn[standard]>=0.27.0",
         "python-multipart>=0.0.6",
+        "httpx>=0.24.0",
     ],
     entry_points={
         "console_scripts": [
             "flsd-run=src.run_services:main",
             "flsd-api=src.api:start_api",
             "flsd-dashboard=src.dashboard:run_dashboard",
-            "flsd-pipeline=src.pipeline:run_nightly_update",
+            "flsd-pipeline=src.nightly:run_nightly_update",
+            "flsd-scenarios=src.scenarios:main",
+            "flsd-loadtest=src.loadtest:main",
+            "flsd-worker=src.worker:main",
         ],
     },
     classifiers=[
@@ -1,20 +1,40 @@
 """
 API service for data pipeline interactions.
+
+The pipeline (and with it pandas) is imported on the first upload rather
+than at startup. Set ``FLSD_PREWARM=1`` to load it in the background as
+soon as the app starts. Auto-reload is off unless ``FLSD_RELOAD=1`` is set.
 """
 
 import os
+import re
+import threading
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-from pathlib import Path
-import uvicorn
 
-from src.utils.paths import get_data_path
-from src.pipeline import process_file_by_type
+from src.utils.logs import configure_logging
+from src.utils.paths import get_data_path, get_latest_processed
+from src.validation import DEFAULT_POLICY, POLICIES, ValidationError
+from src.worker import enqueue
+
+
+def _prewarm():
+    import src.pipeline  # noqa: F401
+
 
-app = FastAPI(title="FLSD Data Pipeline API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    if os.environ.get("FLSD_PREWARM", "").lower() in ("1", "true", "yes"):
+        # Load in the background so the app is ready without waiting for it
+        threading.Thread(target=_prewarm, daemon=True).start()
+    yield
+
+
+app = FastAPI(title="FLSD Data Pipeline API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -26,7 +46,7 @@ app.add_middleware(
 )
 
 @app.post("/upload/")
-async def upload_csv(file: UploadFile = File(...)):
+async def upload_csv(file: UploadFile = File(...), policy: str = DEFAULT_POLICY, defer: bool = False):
     """
     Upload a CSV file to be processed by the pipeline.
     
@@ -37,10 +57,19 @@ async def upload_csv(file: UploadFile = File(...)):
     - date: Date in YYYYMMDD format
     
     Example: financial_quarterly_20231231.csv
+
+    The optional ``policy`` query parameter controls how invalid rows are
+    handled: "reject", "quarantine" (default) or "coerce".
+
+    With ``defer=true`` the file is added to the worker spool instead of being
+    processed in the API process; run ``flsd-worker`` to process it.
     """
     # Validate file type
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are supported")
+
+    if policy not in POLICIES:
+        raise HTTPException(status_code=400, detail=f"Invalid policy: {policy}. Use one of {', '.join(POLICIES)}")
     
     # Parse filename to determine processing type
     try:
@@ -55,11 +84,24 @@ async def upload_csv(file: UploadFile = File(...)):
             
         data_type = parts[0].lower()
         
-        # Create unique temp filename for storage
+        # Create unique temp filename for storage, keeping the description
+        # because it names the series for incremental market indicators
+        description = re.sub(r"[^A-Za-z0-9-]+", "-", "_".join(parts[1:-1])).strip("-") or "upload"
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         unique_id = str(uuid.uuid4())[:8]
-        temp_filename = f"{data_type}_{timestamp}_{unique_id}.csv"
+        temp_filename = f"{data_type}_{description}_{timestamp}-{unique_id}.csv"
         
+        if defer:
+            spooled = enqueue(await file.read(), temp_filename, policy=policy)
+            return {
+                "filename": filename,
+                "saved_as": temp_filename,
+                "type": data_type,
+                "policy": policy,
+                "spooled_file": str(spooled),
+                "status": "queued"
+            }
+
         # Save uploaded file to raw directory
         raw_dir = get_data_path("raw")
         raw_dir.mkdir(parents=True, exist_ok=True)
@@ -70,7 +112,8 @@ async def upload_csv(file: UploadFile = File(...)):
             f.write(content)
             
         # Process the file based on its type
-        result = process_file_by_type(file_path, data_type)
+        from src.pipeline import process_file_by_type
+        result = process_file_by_type(file_path, data_type, policy)
         
         return {
             "filename": filename,
@@ -80,7 +123,17 @@ async def upload_csv(file: UploadFile = File(...)):
             "status": "success"
         }
         
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.report.to_dict())
     except Exception as e:
+        # Errors past this point come from the pipeline, which is loaded by now
+        from src.indicators import OverlapError
+
+        if isinstance(e, OverlapError):
+            # Rows that do not fit the processed series are the client's to fix
+            raise HTTPException(status_code=409, detail=str(e))
         # Log the error
         print(f"Error processing upload: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing upload: {str(e)}")
@@ -100,13 +153,11 @@ async def get_data_types():
 @app.get("/data/latest/{data_type}")
 async def get_latest_data(data_type: str):
     """Get information about the latest processed data for a specific type"""
-    processed_dir = get_data_path("processed")
     try:
-        files = list(processed_dir.glob(f"{data_type}_*.csv"))
-        if not files:
+        latest = get_latest_processed(data_type)
+        if latest is None:
             return {"status": "no_data", "message": f"No processed data found for type: {data_type}"}
             
-        latest = max(files, key=lambda p: p.stat().st_mtime)
         return {
             "status": "success",
             "filename": latest.name,
@@ -116,9 +167,20 @@ async def get_latest_data(data_type: str):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-def start_api(host="0.0.0.0", port=8000):
-    """Start the API server"""
-    uvicorn.run("src.api:app", host=host, port=port, reload=True)
+def start_api(host="0.0.0.0", port=8000, reload=None):
+    """
+    Start the API server.
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on
+        reload: Restart on code changes (development only). Defaults to
+            the ``FLSD_RELOAD`` environment variable, off when unset.
+    """
+    import uvicorn
+    if reload is None:
+        reload = os.environ.get("FLSD_RELOAD", "").lower() in ("1", "true", "yes")
+    uvicorn.run("src.api:app", host=host, port=port, reload=reload)
 
 if __name__ == "__main__":
     start_api() 
\ No newline at end of file
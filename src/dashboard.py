@@ -1,10 +1,28 @@
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 from pathlib import Path
-from src.utils.paths import get_data_path
+from src.utils.paths import get_data_path, get_latest_processed
+
+
+def find_latest_file(data_type=None):
+    """
+    Find the latest processed file.
+
+    Args:
+        data_type: If provided, find the latest file for a specific type
+
+    Returns:
+        Path to the file or None if not found
+    """
+    processed_dir = get_data_path("processed")
+    
+    if data_type:
+        return get_latest_processed(data_type)
+
+    # Default to latest.csv if no type specified
+    latest_file = processed_dir / "latest.csv"
+    return latest_file if latest_file.exists() else None
 
 
 def load_latest_data(data_type=None):
@@ -17,25 +35,67 @@ def load_latest_data(data_type=None):
     Returns:
         DataFrame with the data or None if not found
     """
-    processed_dir = get_data_path("processed")
-    
-    if data_type:
-        # Find the latest file for the specified type
-        files = list(processed_dir.glob(f"{data_type}_*.csv"))
-        if not files:
-            return None
-        latest_file = max(files, key=lambda p: p.stat().st_mtime)
-    else:
-        # Default to latest.csv if no type specified
-        latest_file = processed_dir / "latest.csv"
-        if not latest_file.exists():
-            return None
-    
+    latest_file = find_latest_file(data_type)
+    if latest_file is None:
+        return None
     return pd.read_csv(latest_file)
 
 
+def load_scenario_bands(source_file):
+    """
+    Load the scenario bands ``flsd-scenarios`` produced for a forecast file.
+
+    Args:
+        source_file: The processed forecast file being displayed
+
+    Returns:
+        DataFrame with percentile bands, or None if there are none for
+        this exact file
+    """
+    from src.scenarios import bands_filename
+    from src.stages import file_hash
+
+    source_hash = file_hash(source_file)
+    bands_file = get_data_path("processed") / bands_filename(source_hash)
+    if not bands_file.exists():
+        return None
+    bands = pd.read_csv(bands_file)
+    if 'source' not in bands.columns or (bands['source'] != source_hash).any():
+        return None
+    bands['date'] = pd.to_datetime(bands['date'])
+    return bands
+
+
+def add_band_traces(fig, bands, lower, upper, name, color):
+    """Add a filled band between two percentile columns, if both exist"""
+    import plotly.graph_objects as go
+
+    if lower not in bands.columns or upper not in bands.columns:
+        return
+    fig.add_trace(go.Scatter(
+        x=bands['date'],
+        y=bands[upper],
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=bands['date'],
+        y=bands[lower],
+        mode='lines',
+        line=dict(width=0),
+        fill='tonexty',
+        fillcolor=color,
+        name=name
+    ))
+
+
 def display_financial_data(df):
     """Display financial data with appropriate visualizations"""
+    # Plotly is only loaded once a chart is needed
+    import plotly.express as px
+
     st.subheader("Financial Data Overview")
     
     # Check for expected columns
@@ -83,6 +143,9 @@ def display_financial_data(df):
 
 def display_market_data(df):
     """Display market data with appropriate visualizations"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.subheader("Market Data Overview")
     
     # Check for expected columns
@@ -132,6 +195,34 @@ def display_market_data(df):
                 title='Daily Percent Change'
             )
             st.plotly_chart(fig, use_container_width=True)
+
+        # Rolling indicators if available
+        mean_columns = [col for col in df.columns if col.startswith('rolling_mean_')]
+        if mean_columns:
+            fig = px.line(
+                df,
+                x='date',
+                y=['price'] + mean_columns,
+                title='Price and Rolling Means'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        vol_columns = [col for col in df.columns if col.startswith('rolling_vol_')]
+        if vol_columns:
+            fig = px.line(
+                df,
+                x='date',
+                y=vol_columns,
+                title='Rolling Volatility (%)'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        if 'drawdown' in df.columns and 'cum_return' in df.columns:
+            col1, col2 = st.columns(2)
+            fig = px.area(df, x='date', y='drawdown', title='Drawdown (%)')
+            col1.plotly_chart(fig, use_container_width=True)
+            fig = px.line(df, x='date', y='cum_return', title='Cumulative Return (%)')
+            col2.plotly_chart(fig, use_container_width=True)
     else:
         st.warning("Market data missing expected columns (date, price)")
     
@@ -140,8 +231,10 @@ def display_market_data(df):
     st.dataframe(df)
 
 
-def display_forecast_data(df):
+def display_forecast_data(df, source_file=None):
     """Display forecast data with appropriate visualizations"""
+    import plotly.graph_objects as go
+
     st.subheader("Forecast Data Overview")
     
     # Check for expected columns
@@ -186,6 +279,12 @@ def display_forecast_data(df):
                 name='Forecast',
                 line=dict(color='red', dash='dash')
             ))
+
+        # Scenario percentile bands if available
+        bands = load_scenario_bands(source_file) if source_file is not None else None
+        if bands is not None:
+            add_band_traces(fig, bands, 'p5', 'p95', 'Scenarios 5-95%', 'rgba(255, 0, 0, 0.1)')
+            add_band_traces(fig, bands, 'p25', 'p75', 'Scenarios 25-75%', 'rgba(255, 0, 0, 0.2)')
             
         fig.update_layout(title='Historical Data and Forecast')
         st.plotly_chart(fig, use_container_width=True)
@@ -234,7 +333,7 @@ def run_dashboard() -> None:
             elif data_type == "market":
                 display_market_data(df)
             elif data_type == "forecast":
-                display_forecast_data(df)
+                display_forecast_data(df, find_latest_file(data_type))
         else:
             st.warning(f"No {data_type} data found. Upload a CSV with the {data_type}_*.csv naming convention.")
     
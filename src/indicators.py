@@ -0,0 +1,306 @@
+"""
+Rolling indicators for market data, maintained incrementally across runs.
+
+``compute_indicators`` computes rolling means, rolling volatility, drawdown
+and cumulative returns on ``price``. Given the ``IndicatorState`` left by the
+previous run it only processes the new rows: the stored tail of prices seeds
+the rolling windows, and the running peak and base price carry drawdown and
+cumulative return across file boundaries. Work per run is proportional to
+the new rows plus one window, not to the full history.
+
+State is kept per series (a symbol, or the description in the file name),
+so unrelated series never share a price history. The state after each run
+is kept as a checkpoint (the last ``MAX_CHECKPOINTS``), and each state's
+tail keeps ``TAIL_OVERLAP`` spare rows with their dates and running peaks.
+A file that repeats the last few processed rows, such as an inclusive daily
+export, recomputes them from the tail; a file that goes back further, such
+as a corrected resend, continues from the checkpoint before the run it
+replaces. Callers that load, advance and save a state hold ``state_lock``
+so concurrent processes cannot interleave updates.
+"""
+
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .utils.locks import file_lock
+from .utils.paths import get_data_path
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = (5, 20)
+DEFAULT_SERIES = "default"
+
+# Indicator states kept per series for restarting from an earlier point
+MAX_CHECKPOINTS = 30
+
+# Rows kept in the tail beyond the longest window, so a file repeating up to
+# this many processed rows can recompute them exactly
+TAIL_OVERLAP = 10
+
+
+class OverlapError(ValueError):
+    """Raised when new rows cannot be placed in the processed series."""
+
+
+def indicator_columns(windows: Sequence[int] = WINDOWS) -> Tuple[str, ...]:
+    """Return the names of the columns produced for the given windows."""
+    columns = []
+    for w in windows:
+        columns += [f"rolling_mean_{w}", f"rolling_vol_{w}"]
+    return tuple(columns) + ("drawdown", "cum_return")
+
+
+@dataclass
+class IndicatorState:
+    """Everything needed to continue the indicators from the last processed row."""
+
+    last_date: str
+    tail: List[float]
+    peak: float
+    base: float
+    windows: Tuple[int, ...] = WINDOWS
+    # First date of the whole series, i.e. where ``base`` comes from
+    first_date: str = ""
+    # First date of the rows the last run processed
+    start_date: str = ""
+    # Date and running peak of each tail price ("" / NaN if unknown)
+    tail_dates: List[str] = field(default_factory=list)
+    tail_peaks: List[float] = field(default_factory=list)
+
+
+def compute_indicators(
+    dates: pd.Series,
+    prices: pd.Series,
+    state: Optional[IndicatorState] = None,
+    windows: Sequence[int] = WINDOWS,
+) -> Tuple[Dict[str, np.ndarray], IndicatorState]:
+    """
+    Compute indicators for new rows, continuing from a previous state.
+
+    Args:
+        dates: Dates of the new rows, sorted ascending
+        prices: Prices of the new rows
+        state: State from the previous run, or None to start from scratch
+        windows: Rolling window lengths, in rows
+
+    Returns:
+        Tuple of ({column: values} for the new rows, state after these rows)
+    """
+    windows = tuple(windows)
+    prices = np.asarray(prices, dtype=float)
+    if state is not None and tuple(state.windows) != windows:
+        logger.info("Indicator windows changed, starting from scratch")
+        state = None
+
+    tail = np.asarray(state.tail if state else [], dtype=float)
+    peak = state.peak if state else -np.inf
+    base = state.base if state else np.nan
+    if np.isnan(base):
+        # Missing prices stay null, so the base is the first known price
+        valid = prices[~np.isnan(prices)]
+        base = valid[0] if len(valid) else np.nan
+
+    # Seed the rolling windows with the tail of the previous run
+    full = pd.Series(np.concatenate([tail, prices]))
+    returns = full.pct_change(fill_method=None) * 100
+    k = len(tail)
+
+    result = {}
+    for w in windows:
+        result[f"rolling_mean_{w}"] = full.rolling(w).mean().to_numpy()[k:]
+        result[f"rolling_vol_{w}"] = returns.rolling(w).std().to_numpy()[k:]
+
+    # fmax skips missing prices instead of propagating them
+    running_peak = np.fmax.accumulate(np.concatenate([[peak], prices]))[1:]
+    result["drawdown"] = (prices / running_peak - 1) * 100
+    result["cum_return"] = (prices / base - 1) * 100
+
+    # Keep one more price than the longest window so returns can be rebuilt,
+    # plus spare rows for files that repeat the last processed rows
+    keep = max(windows) + 1 + TAIL_OVERLAP
+    new_dates = [pd.Timestamp(d).isoformat() for d in dates]
+    # States written before dates and peaks were tracked have neither
+    known = state is not None and len(state.tail_dates) == len(tail)
+    tail_dates = (state.tail_dates if known else [""] * len(tail)) + new_dates
+    tail_peaks = (state.tail_peaks if known else [np.nan] * len(tail)) + running_peak.tolist()
+    start_date = new_dates[0] if new_dates else ""
+    new_state = IndicatorState(
+        last_date=new_dates[-1] if new_dates else (state.last_date if state else ""),
+        tail=full.to_numpy()[-keep:].tolist(),
+        peak=float(running_peak[-1]) if len(prices) else peak,
+        base=float(base),
+        windows=windows,
+        first_date=state.first_date if state else start_date,
+        start_date=start_date or (state.start_date if state else ""),
+        tail_dates=tail_dates[-keep:],
+        tail_peaks=[float(p) for p in tail_peaks[-keep:]],
+    )
+    return result, new_state
+
+
+def _rewind(state: IndicatorState, first: pd.Timestamp) -> Optional[IndicatorState]:
+    """
+    Return ``state`` as it was before the row at ``first``, or None if the
+    rows from ``first`` on are no longer in its tail.
+    """
+    if first > pd.Timestamp(state.last_date):
+        return state
+    if not state.tail_dates or "" in state.tail_dates:
+        return None
+
+    kept = int((pd.to_datetime(state.tail_dates) < first).sum())
+    # The tail must still seed the longest window, unless it reaches back to
+    # the start of the series
+    whole_series = state.tail_dates[0] == state.first_date
+    if kept == 0 or (kept < max(state.windows) + 1 and not whole_series):
+        return None
+    return IndicatorState(
+        last_date=state.tail_dates[kept - 1],
+        tail=state.tail[:kept],
+        peak=state.tail_peaks[kept - 1],
+        base=state.base,
+        windows=state.windows,
+        first_date=state.first_date,
+        start_date=state.start_date,
+        tail_dates=state.tail_dates[:kept],
+        tail_peaks=state.tail_peaks[:kept],
+    )
+
+
+def _state_file(data_type: str, series: str) -> Path:
+    # Series names come from file names and data, so keep them path-safe
+    safe = re.sub(r"[^A-Za-z0-9-]+", "-", str(series)).strip("-") or DEFAULT_SERIES
+    return get_data_path("state") / f"{data_type}_{safe}_indicators.json"
+
+
+def state_lock(data_type: str = "market", series: str = DEFAULT_SERIES):
+    """Return a context manager holding the lock on a series' indicator state."""
+    return file_lock(_state_file(data_type, series).with_suffix(".lock"))
+
+
+def _parse_state(data: dict) -> IndicatorState:
+    data = dict(data, windows=tuple(data["windows"]))
+    return IndicatorState(**data)
+
+
+def load_checkpoints(data_type: str = "market", series: str = DEFAULT_SERIES) -> List[IndicatorState]:
+    """Load the persisted indicator states of a series, oldest first."""
+    state_file = _state_file(data_type, series)
+    if not state_file.exists():
+        return []
+    try:
+        data = json.loads(state_file.read_text())
+        # Older state files hold a single state
+        checkpoints = data["checkpoints"] if "checkpoints" in data else [data]
+        return [_parse_state(item) for item in checkpoints]
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable indicator state {state_file}: {str(e)}")
+        return []
+
+
+def load_state(data_type: str = "market", series: str = DEFAULT_SERIES) -> Optional[IndicatorState]:
+    """Load the latest persisted indicator state of a series, or None if there is none."""
+    checkpoints = load_checkpoints(data_type, series)
+    return checkpoints[-1] if checkpoints else None
+
+
+def resume_state(
+    first: pd.Timestamp,
+    data_type: str = "market",
+    series: str = DEFAULT_SERIES,
+) -> Optional[IndicatorState]:
+    """
+    Return the state to continue from for new rows starting at ``first``.
+
+    Rows after the latest state continue from it. Rows that repeat the last
+    few processed rows continue from the latest state rewound within its
+    tail. Rows that go back further continue from the last checkpoint before
+    the run that first covered them, or from scratch if they cover the whole
+    series.
+
+    Args:
+        first: Date of the first new row
+        data_type: Type of data the state belongs to
+        series: Series the rows belong to
+
+    Returns:
+        The state to continue from, or None to start from scratch
+
+    Raises:
+        OverlapError: If the new rows start partway through an earlier
+            processed run, so continuing from any checkpoint would skip rows
+    """
+    checkpoints = load_checkpoints(data_type, series)
+    if not checkpoints:
+        return None
+
+    latest = checkpoints[-1]
+    if first > pd.Timestamp(latest.last_date):
+        return latest
+
+    # Earliest run reaching the new rows; checkpoint i is the state after run i
+    i = next(i for i, state in enumerate(checkpoints) if pd.Timestamp(state.last_date) >= first)
+    replaced = checkpoints[i]
+
+    rewound = _rewind(replaced, first)
+    if rewound is not None:
+        logger.info(f"{data_type} {series} data from {first.date()} repeats processed rows, "
+                    f"recomputing them from {rewound.last_date}")
+        return rewound
+
+    if replaced.start_date and first <= pd.Timestamp(replaced.start_date):
+        if i > 0:
+            logger.warning(f"{data_type} {series} data from {first.date()} overlaps processed rows, "
+                           f"continuing indicators from the checkpoint at {checkpoints[i - 1].last_date}")
+            return checkpoints[i - 1]
+        if first <= pd.Timestamp(replaced.first_date):
+            logger.warning(f"{data_type} {series} data from {first.date()} covers the whole processed "
+                           f"series, restarting indicators")
+            return None
+
+    resend_from = pd.Timestamp(replaced.start_date).date() if replaced.start_date else "the series start"
+    raise OverlapError(f"{data_type} {series} data from {first.date()} starts partway through previously "
+                       f"processed rows; resend them from {resend_from} to update the indicators")
+
+
+def save_state(
+    state: IndicatorState,
+    data_type: str = "market",
+    series: str = DEFAULT_SERIES,
+    resumed: Optional[IndicatorState] = None,
+) -> Path:
+    """
+    Persist the indicator state of a series for the next run.
+
+    Checkpoints at or after the state's ``start_date`` describe rows that
+    were just reprocessed and are dropped.
+
+    Args:
+        state: State after the rows just processed
+        data_type: Type of data the state belongs to
+        series: Series the state belongs to
+        resumed: State the run continued from, as returned by
+            ``resume_state``. If it was rewound within a tail it is kept
+            as a checkpoint too, so later resends can start from it.
+    """
+    checkpoints = load_checkpoints(data_type, series)
+    if state.start_date:
+        start = pd.Timestamp(state.start_date)
+        checkpoints = [c for c in checkpoints if pd.Timestamp(c.last_date) < start]
+    if resumed is not None and (not checkpoints or checkpoints[-1].last_date != resumed.last_date):
+        checkpoints.append(resumed)
+    checkpoints = (checkpoints + [state])[-MAX_CHECKPOINTS:]
+
+    state_file = _state_file(data_type, series)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = state_file.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps({"checkpoints": [asdict(c) for c in checkpoints]}))
+    tmp_file.replace(state_file)
+    return state_file
@@ -0,0 +1,300 @@
+"""
+Load-test harness for the upload and query API.
+
+Drives the FastAPI app either in-process (through httpx's ASGI transport) or
+against a running server with a configurable mix of ``/upload/`` requests
+and ``/data/latest/{data_type}`` reads. Reports throughput, latency
+percentiles, error rates and server RSS over time as JSON so runs can be
+compared with ``--baseline``.
+
+Every upload has different content, so uploads measure the full pipeline
+rather than hits in the stage cache. In-process runs write to a temporary
+data directory (``FLSD_DATA_DIR``) unless ``--data-dir`` says otherwise; a
+server targeted with ``--url`` should be started with ``FLSD_DATA_DIR`` set.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DATA_TYPES = ("financial", "market", "forecast")
+
+# Metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "error_rate": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def make_csv(data_type: str, rows: int, seed: int = 0) -> bytes:
+    """Build a synthetic CSV upload of the given type and size."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(rows)]
+    out = io.StringIO()
+    if data_type == "financial":
+        out.write("date,amount,category\n")
+        for d, a in zip(dates, rng.normal(0, 1000, rows)):
+            out.write(f"{d},{a:.2f},{'revenue' if a >= 0 else 'expense'}\n")
+    elif data_type == "market":
+        out.write("date,symbol,price,volume\n")
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+        for d, p, v in zip(dates, prices, rng.integers(1000, 100000, rows)):
+            out.write(f"{d},TEST,{p:.2f},{v}\n")
+    else:
+        out.write("date,prediction,confidence\n")
+        for d, p, c in zip(dates, np.cumsum(rng.normal(0, 1, rows)) + 100, rng.uniform(0, 1, rows)):
+            out.write(f"{d},{p:.2f},{c:.2f}\n")
+    return out.getvalue().encode()
+
+
+def rss_bytes(pid: Optional[int]) -> Optional[int]:
+    """Return the resident set size of a process, or None if unavailable."""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        try:
+            import resource
+        except ImportError:
+            return None
+        # Peak rather than current RSS; ru_maxrss is bytes on macOS, KiB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+def _percentiles(latencies: Sequence[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+
+def _summarise(latencies: List[float], errors: int, elapsed: float) -> dict:
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        **_percentiles(latencies),
+    }
+
+
+async def run_load(
+    client,
+    duration: float = 30.0,
+    concurrency: int = 10,
+    upload_weight: float = 0.2,
+    upload_rows: Sequence[int] = (100, 1000),
+    data_types: Sequence[str] = DATA_TYPES,
+    server_pid: Optional[int] = None,
+    sample_interval: float = 1.0,
+    seed: int = 0,
+) -> dict:
+    """
+    Drive the API with a mix of uploads and reads for a fixed duration.
+
+    Args:
+        client: An ``httpx.AsyncClient`` pointed at the API
+        duration: Test duration in seconds
+        concurrency: Number of concurrent simulated clients
+        upload_weight: Fraction of requests that are uploads
+        upload_rows: Upload sizes (rows) to choose from
+        data_types: Data types to upload and query
+        server_pid: PID whose RSS is sampled, if known
+        sample_interval: Seconds between time-series samples
+        seed: Seed for the request mix and upload contents
+
+    Returns:
+        Dict with per-operation summaries and a time series
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    timeseries = []
+    interval_counts = {"requests": 0, "errors": 0}
+
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def request(op: str, coro) -> None:
+        t0 = time.perf_counter()
+        try:
+            response = await coro
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        latencies[op].append(time.perf_counter() - t0)
+        interval_counts["requests"] += 1
+        if failed:
+            errors[op] += 1
+            interval_counts["errors"] += 1
+
+    async def simulated_client(worker: int) -> None:
+        rng = random.Random(seed * 1000 + worker)
+        while time.perf_counter() < deadline:
+            data_type = rng.choice(data_types)
+            if rng.random() < upload_weight:
+                rows = rng.choice(upload_rows)
+                filename = f"{data_type}_loadtest_{datetime.now().strftime('%Y%m%d')}.csv"
+                # Fresh contents per upload; identical files would be served from the stage cache
+                payload = make_csv(data_type, rows, seed=rng.getrandbits(32))
+                files = {"file": (filename, payload, "text/csv")}
+                await request(f"upload_{rows}", client.post("/upload/", files=files))
+            else:
+                await request("latest", client.get(f"/data/latest/{data_type}"))
+
+    async def sampler() -> None:
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(sample_interval)
+            timeseries.append({
+                "t": round(time.perf_counter() - start, 2),
+                "requests": interval_counts["requests"],
+                "errors": interval_counts["errors"],
+                "rss_bytes": rss_bytes(server_pid),
+            })
+            interval_counts["requests"] = interval_counts["errors"] = 0
+
+    await asyncio.gather(sampler(), *(simulated_client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [x for values in latencies.values() for x in values]
+    rss_values = [s["rss_bytes"] for s in timeseries if s["rss_bytes"] is not None]
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "overall": _summarise(all_latencies, sum(errors.values()), elapsed),
+        "operations": {op: _summarise(values, errors[op], elapsed) for op, values in sorted(latencies.items())},
+        "peak_rss_bytes": max(rss_values) if rss_values else None,
+        "timeseries": timeseries,
+    }
+
+
+def compare(result: dict, baseline: dict) -> List[str]:
+    """Return human-readable lines comparing a result with a baseline run."""
+    lines = []
+    ops = ["overall"] + sorted(result["operations"])
+    for op in ops:
+        current = result["overall"] if op == "overall" else result["operations"].get(op)
+        previous = baseline["overall"] if op == "overall" else baseline.get("operations", {}).get(op)
+        if not current or not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            new, old = current.get(metric), previous.get(metric)
+            if new is None or old is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            worse = change < 0 if higher_is_better else change > 0
+            flag = " (worse)" if worse and abs(change) >= 10 else ""
+            lines.append(f"{op:>14} {metric:>15}: {old:>10} -> {new:>10} ({change:+.1f}%){flag}")
+    return lines
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command-line entry point for the load generator."""
+    parser = argparse.ArgumentParser(description="Load-test the FLSD API")
+    parser.add_argument("--url", default=None,
+                        help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--server-pid", type=int, default=None,
+                        help="PID of the server to sample RSS from when using --url")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent simulated clients")
+    parser.add_argument("--upload-weight", type=float, default=0.2, help="Fraction of requests that are uploads")
+    parser.add_argument("--upload-rows", type=int, nargs="+", default=[100, 1000], help="Upload sizes in rows")
+    parser.add_argument("--types", nargs="+", default=list(DATA_TYPES), choices=DATA_TYPES,
+                        help="Data types to upload and query")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the request mix and upload contents")
+    parser.add_argument("--data-dir", default=None,
+                        help="Data directory for in-process runs (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="Write the JSON result to this file")
+    parser.add_argument("--baseline", default=None, help="Compare with a previous JSON result")
+    args = parser.parse_args(argv)
+
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+        server_pid = args.server_pid
+    else:
+        # Keep synthetic uploads out of the real data directory; a temporary
+        # one is removed when the process exits
+        if args.data_dir is None:
+            tmp_dir = tempfile.TemporaryDirectory(prefix="flsd-loadtest-")
+        os.environ["FLSD_DATA_DIR"] = args.data_dir or tmp_dir.name
+
+        from src.api import app
+
+        # The pipeline logs every upload at INFO, which would drown the report
+        logging.getLogger("src").setLevel(logging.WARNING)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=None)
+        server_pid = os.getpid()
+
+    async def run() -> dict:
+        async with client:
+            return await run_load(
+                client,
+                duration=args.duration,
+                concurrency=args.concurrency,
+                upload_weight=args.upload_weight,
+                upload_rows=args.upload_rows,
+                data_types=args.types,
+                server_pid=server_pid,
+                seed=args.seed,
+            )
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "target": args.url or "in-process",
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "data_dir")},
+        **asyncio.run(run()),
+    }
+
+    overall = result["overall"]
+    print(f"{overall['requests']} requests in {result['elapsed_s']}s: "
+          f"{overall['throughput_rps']} req/s, error rate {overall['error_rate']:.2%}, "
+          f"p50 {overall['p50_ms']} ms, p95 {overall['p95_ms']} ms, p99 {overall['p99_ms']} ms")
+    for op, summary in result["operations"].items():
+        print(f"  {op}: {summary['requests']} requests, {summary['throughput_rps']} req/s, "
+              f"p95 {summary['p95_ms']} ms, errors {summary['errors']}")
+    if result["peak_rss_bytes"]:
+        print(f"Peak server RSS: {result['peak_rss_bytes'] / 2**20:.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Comparison with {args.baseline}:")
+        for line in compare(result, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Nightly update entry point (``flsd-pipeline``).
+
+Finds the most recent upload before importing the pipeline, so a run with
+nothing to process never loads pandas.
+"""
+
+import logging
+
+from .utils.logs import configure_logging
+from .utils.paths import get_data_path
+
+logger = logging.getLogger(__name__)
+
+
+def run_nightly_update() -> None:
+    """Process the most recent uploaded CSV and store it as processed data."""
+    configure_logging()
+    logger.info("Running nightly update")
+    raw_dir = get_data_path("raw")
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    uploads = list(raw_dir.glob("*.csv"))
+    
+    if not uploads:
+        logger.warning("No CSV uploads found in data/raw")
+        return
+    
+    latest = max(uploads, key=lambda p: p.stat().st_mtime)
+    logger.info(f"Processing latest file: {latest}")
+
+    from .pipeline import detect_data_type, process_file_by_type
+
+    # Process the file based on its type
+    data_type = detect_data_type(latest)
+    output_file = process_file_by_type(latest, data_type)
+    logger.info(f"Processed data saved to {output_file}")
+
+
+if __name__ == "__main__":
+    run_nightly_update()
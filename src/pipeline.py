@@ -1,12 +1,25 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import logging
+import os
 from datetime import datetime
-from .utils.paths import get_data_path
+from typing import Iterable, Optional
+from .indicators import (
+    DEFAULT_SERIES,
+    compute_indicators,
+    indicator_columns,
+    resume_state,
+    save_state,
+    state_lock,
+)
+from .stages import DEFAULT_TYPE, execute, file_hash, load_cached, register_stage, save_cached
+from .utils.paths import get_data_path, get_latest_pointer
+from .validation import DEFAULT_POLICY, schema_columns, schema_fingerprint, validate
+
+# Kept importable from here; the entry point lives in src/nightly.py
+from .nightly import run_nightly_update  # noqa: F401
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def load_csv(path: Path) -> pd.DataFrame:
@@ -15,14 +28,36 @@ def load_csv(path: Path) -> pd.DataFrame:
     return pd.read_csv(path)
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Simple cleanup operations used by all pipelines."""
+def clean_data(df: pd.DataFrame, keep_nulls: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Simple cleanup operations used by all pipelines.
+
+    Args:
+        df: The dataframe to clean
+        keep_nulls: Columns whose missing values are left as nulls instead
+            of being filled with 0
+    """
     logger.info("Performing basic data cleaning")
     df = df.drop_duplicates()
-    return df.fillna(0)
+    keep_nulls = set(keep_nulls)
+    if not keep_nulls:
+        return df.fillna(0)
+    return df.fillna({col: 0 for col in df.columns if col not in keep_nulls})
+
+
+def _write_csv(df: pd.DataFrame, path: Path) -> None:
+    """Write a CSV atomically so concurrent readers never see a partial file."""
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    df.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, path)
 
 
-def save_processed(df: pd.DataFrame, name: str = "latest.csv", data_type: str = None) -> Path:
+def save_processed(
+    df: pd.DataFrame,
+    name: str = "latest.csv",
+    data_type: str = None,
+    source_name: str = None,
+) -> Path:
     """
     Save processed dataframe to the processed directory.
     
@@ -30,6 +65,8 @@ def save_processed(df: pd.DataFrame, name: str = "latest.csv", data_type: str =
         df: The dataframe to save
         name: The filename to save as
         data_type: The type of data (to be used in filename prefix)
+        source_name: Stem of the raw file, included in the filename so
+            results from different files processed on the same day are kept
         
     Returns:
         Path to the saved file
@@ -40,22 +77,149 @@ def save_processed(df: pd.DataFrame, name: str = "latest.csv", data_type: str =
     # If data_type is provided, create a type-specific filename
     if data_type:
         timestamp = datetime.now().strftime("%Y%m%d")
-        filename = f"{data_type}_{timestamp}_{name}"
+        prefix = f"{data_type}_{timestamp}_{source_name}" if source_name else f"{data_type}_{timestamp}"
+        filename = f"{prefix}_{name}"
     else:
         filename = name
     
     out_file = out_dir / filename
     logger.info(f"Saving processed data to {out_file}")
-    df.to_csv(out_file, index=False)
+    _write_csv(df, out_file)
+
+    if data_type:
+        # Readers find the newest file per type without listing the directory
+        pointer = get_latest_pointer(data_type)
+        tmp_file = pointer.with_name(f".{pointer.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(out_file.name)
+        os.replace(tmp_file, pointer)
     
     # Also save as latest.csv for the dashboard
     latest_file = out_dir / "latest.csv"
-    df.to_csv(latest_file, index=False)
+    _write_csv(df, latest_file)
     logger.info(f"Also saved as {latest_file} for dashboard")
     
     return out_file
 
 
+def save_quarantined(df: pd.DataFrame, data_type: str, source_name: str) -> Path:
+    """
+    Save rows rejected by validation to the quarantine directory.
+
+    Quarantined files are kept out of the processed directory so the
+    dashboard never picks them up as the latest data.
+
+    Args:
+        df: The rejected rows, with their original values
+        data_type: The type of data the rows were validated as
+        source_name: Stem of the raw file the rows came from
+
+    Returns:
+        Path to the saved file
+    """
+    out_dir = get_data_path("quarantine")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    out_file = out_dir / f"{data_type}_{timestamp}_{source_name}.csv"
+    logger.warning(f"Quarantining {len(df)} invalid rows to {out_file}")
+    # Keep the original row index so it lines up with the validation report
+    df.to_csv(out_file, index_label="row")
+    return out_file
+
+
+# Supported data types and the processed filename each one is saved under
+OUTPUT_NAMES = {
+    "financial": "financial_data.csv",
+    "market": "market_data.csv",
+    "forecast": "forecast_data.csv",
+}
+DATA_TYPES = tuple(OUTPUT_NAMES)
+
+# Bump when loading or validation wiring changes, to invalidate cached results
+LOAD_VERSION = "1"
+
+
+# Processing stages. Each data type runs its stages in registration order;
+# see src/stages.py for how they are planned, fused and cached.
+
+@register_stage(DATA_TYPES + (DEFAULT_TYPE,), name="clean")
+def _clean_stage(df: pd.DataFrame, context: dict) -> pd.DataFrame:
+    # Validated columns keep their nulls: a value the validator rejected or
+    # coerced away must not turn into a real-looking 0
+    return clean_data(df, keep_nulls=schema_columns(context["data_type"]))
+
+
+@register_stage(DATA_TYPES, kind="column", requires=("date",), provides=("date",), name="parse_dates")
+def _parse_dates_stage(df: pd.DataFrame, context: dict) -> dict:
+    try:
+        return {"date": pd.to_datetime(df["date"])}
+    except Exception as e:
+        logger.warning(f"Could not convert date column: {str(e)}")
+        return {}
+
+
+@register_stage("financial", kind="column", requires=("amount",), provides=("running_total",),
+                name="running_total")
+def _running_total_stage(df: pd.DataFrame, context: dict) -> dict:
+    return {"running_total": df["amount"].cumsum()}
+
+
+@register_stage("market", requires=("date", "price"), name="sort_by_date")
+def _sort_by_date_stage(df: pd.DataFrame, context: dict) -> pd.DataFrame:
+    return df.sort_values("date")
+
+
+@register_stage("market", kind="column", requires=("price",), provides=("pct_change",), name="pct_change")
+def _pct_change_stage(df: pd.DataFrame, context: dict) -> dict:
+    return {"pct_change": df["price"].pct_change(fill_method=None) * 100}
+
+
+def _series_groups(df: pd.DataFrame, context: dict) -> dict:
+    """Map each series in a market frame to its row positions."""
+    if "symbol" in df.columns:
+        symbols = df["symbol"].astype("string").fillna(DEFAULT_SERIES)
+        return symbols.groupby(symbols, sort=False).indices
+    return {context.get("series", DEFAULT_SERIES): np.arange(len(df))}
+
+
+# Reads and writes the persisted indicator state, so it is never cached
+@register_stage("market", kind="column", requires=("date", "price"), provides=indicator_columns(),
+                name="indicators", cache=False)
+def _indicators_stage(df: pd.DataFrame, context: dict) -> dict:
+    columns = {column: np.full(len(df), np.nan) for column in indicator_columns()}
+    for series, positions in _series_groups(df, context).items():
+        rows = df.iloc[positions]
+        if not context.get("incremental"):
+            values, _ = compute_indicators(rows["date"], rows["price"])
+        else:
+            # Continue from the series' state left by the previous file; rows
+            # that go back over processed data continue from an earlier point.
+            # The lock keeps concurrent workers from advancing it at once.
+            with state_lock("market", series):
+                state = resume_state(pd.Timestamp(rows["date"].iloc[0]), "market", series)
+                values, new_state = compute_indicators(rows["date"], rows["price"], state)
+                save_state(new_state, "market", series, resumed=state)
+        for column, column_values in values.items():
+            columns[column][positions] = column_values
+
+    if context.get("incremental") and len(df):
+        logger.info("Updated rolling indicators")
+    return columns
+
+
+@register_stage("forecast", requires=("date", "prediction"), name="check_future_dates")
+def _check_future_dates_stage(df: pd.DataFrame, context: dict) -> pd.DataFrame:
+    # Ensure predictions are for future dates
+    today = pd.Timestamp.now().normalize()
+    future_mask = df["date"] > today
+
+    if not future_mask.any():
+        logger.warning("Forecast data contains no future dates")
+    else:
+        logger.info(f"Forecast contains {future_mask.sum()} future predictions")
+    return df
+
+
 def process_financial_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Process financial data with specific operations.
@@ -65,32 +229,7 @@ def process_financial_data(df: pd.DataFrame) -> pd.DataFrame:
     2. Financial-specific calculations
     """
     logger.info("Processing financial data")
-    
-    # Basic cleaning
-    df = clean_data(df)
-    
-    # Financial-specific processing
-    # Check if expected columns exist
-    required_columns = ['date', 'amount']
-    
-    # If columns don't exist, we'll just log a warning but continue
-    if not all(col in df.columns for col in required_columns):
-        logger.warning("Financial data missing required columns: date, amount")
-    else:
-        # Ensure date column is properly formatted
-        if 'date' in df.columns:
-            try:
-                df['date'] = pd.to_datetime(df['date'])
-                logger.info("Converted date column to datetime")
-            except Exception as e:
-                logger.warning(f"Could not convert date column: {str(e)}")
-        
-        # Calculate running totals if amount column exists
-        if 'amount' in df.columns:
-            df['running_total'] = df['amount'].cumsum()
-            logger.info("Added running_total column")
-    
-    return df
+    return execute("financial", load=lambda: df)
 
 
 def process_market_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -99,27 +238,10 @@ def process_market_data(df: pd.DataFrame) -> pd.DataFrame:
     
     This pipeline performs:
     1. Basic cleaning
-    2. Market-specific calculations (like percent changes)
+    2. Market-specific calculations (percent changes and rolling indicators)
     """
     logger.info("Processing market data")
-    
-    # Basic cleaning
-    df = clean_data(df)
-    
-    # Market-specific processing
-    # Check for typical market data columns
-    if 'price' in df.columns and 'date' in df.columns:
-        try:
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date')
-            df['pct_change'] = df['price'].pct_change() * 100
-            logger.info("Calculated percent change in prices")
-        except Exception as e:
-            logger.warning(f"Error processing market data: {str(e)}")
-    else:
-        logger.warning("Market data missing expected columns: date, price")
-    
-    return df
+    return execute("market", load=lambda: df)
 
 
 def process_forecast_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -131,90 +253,121 @@ def process_forecast_data(df: pd.DataFrame) -> pd.DataFrame:
     2. Forecast-specific validations
     """
     logger.info("Processing forecast data")
-    
-    # Basic cleaning
-    df = clean_data(df)
-    
-    # Forecast-specific processing
-    if 'prediction' in df.columns and 'date' in df.columns:
-        try:
-            df['date'] = pd.to_datetime(df['date'])
-            # Ensure predictions are for future dates
-            today = pd.Timestamp.now().normalize()
-            future_mask = df['date'] > today
-            
-            if not future_mask.any():
-                logger.warning("Forecast data contains no future dates")
-            else:
-                logger.info(f"Forecast contains {future_mask.sum()} future predictions")
-        except Exception as e:
-            logger.warning(f"Error processing forecast data: {str(e)}")
-    else:
-        logger.warning("Forecast data missing expected columns: date, prediction")
-    
-    return df
+    return execute("forecast", load=lambda: df)
 
 
-def process_file_by_type(file_path: Path, data_type: str) -> Path:
+def process_file(
+    file_path: Path,
+    data_type: str,
+    policy: str = DEFAULT_POLICY,
+    outputs: Optional[Iterable[str]] = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
     """
-    Process a file based on its data type.
-    
+    Load, validate and process a file based on its data type, without saving it.
+
     Args:
         file_path: Path to the raw CSV file
         data_type: Type of data to determine processing pipeline
-        
+        policy: Validation policy for invalid rows ("reject", "quarantine" or "coerce")
+        outputs: Derived columns to compute. If None, all stages run.
+        use_cache: Reuse cached intermediate results for this file, if any
+
     Returns:
-        Path to the processed output file
+        The processed DataFrame
+
+    Raises:
+        ValidationError: If policy is "reject" and the file fails validation
     """
     logger.info(f"Processing file {file_path} as {data_type} data")
-    
-    # Load the data
-    df = load_csv(file_path)
-    
-    # Process based on type
-    if data_type == "financial":
-        processed_df = process_financial_data(df)
-        output_name = "financial_data.csv"
-    elif data_type == "market":
-        processed_df = process_market_data(df)
-        output_name = "market_data.csv"
-    elif data_type == "forecast":
-        processed_df = process_forecast_data(df)
-        output_name = "forecast_data.csv"
-    else:
-        # Default processing for unknown types
+    file_path = Path(file_path)
+
+    if data_type not in DATA_TYPES:
         logger.warning(f"Unknown data type: {data_type}, applying default processing")
-        processed_df = clean_data(df)
-        output_name = "custom_data.csv"
-    
-    # Save the processed data
-    output_file = save_processed(processed_df, output_name, data_type)
-    return output_file
 
+    source_key = None
+    if use_cache:
+        source_key = f"{file_hash(file_path)}:{policy}:{schema_fingerprint(data_type)}:{LOAD_VERSION}"
+    loaded = False
 
-def run_nightly_update() -> None:
-    """Process the most recent uploaded CSV and store it as processed data."""
-    logger.info("Running nightly update")
-    raw_dir = get_data_path("raw")
-    raw_dir.mkdir(parents=True, exist_ok=True)
-    uploads = list(raw_dir.glob("*.csv"))
-    
-    if not uploads:
-        logger.warning("No CSV uploads found in data/raw")
-        return
-    
-    latest = max(uploads, key=lambda p: p.stat().st_mtime)
-    logger.info(f"Processing latest file: {latest}")
+    def report_validation(report) -> None:
+        if report.invalid_rows or report.missing_columns:
+            logger.warning(report.summary())
+            logger.info(f"Validation errors: {report.errors}")
+
+    def load() -> pd.DataFrame:
+        nonlocal loaded
+        loaded = True
+        df = load_csv(file_path)
+
+        # Validate before cleaning so bad values are reported rather than zero-filled
+        df, rejected, report = validate(df, data_type, policy)
+        if source_key is not None:
+            save_cached(f"{source_key}:report", report)
+        report_validation(report)
+        if not rejected.empty:
+            save_quarantined(rejected, data_type, file_path.stem)
+        return df
+
+    processed_df = execute(data_type, load, source_key=source_key, outputs=outputs,
+                           context={"incremental": True, "series": series_name(file_path)})
+
+    # Cached results skip load(); log its report again. The rejected rows were
+    # quarantined when the file was first loaded, so they are not written twice.
+    if not loaded and source_key is not None:
+        report = load_cached(f"{source_key}:report")
+        if report is not None:
+            report_validation(report)
+    return processed_df
+
+
+def process_file_by_type(
+    file_path: Path,
+    data_type: str,
+    policy: str = DEFAULT_POLICY,
+    outputs: Optional[Iterable[str]] = None,
+    use_cache: bool = True,
+) -> Path:
+    """
+    Process a file based on its data type and save the result.
     
-    # Try to determine data type from filename
-    parts = latest.stem.split('_')
-    if len(parts) >= 1 and parts[0] in ["financial", "market", "forecast"]:
+    Args:
+        file_path: Path to the raw CSV file
+        data_type: Type of data to determine processing pipeline
+        policy: Validation policy for invalid rows ("reject", "quarantine" or "coerce")
+        outputs: Derived columns to compute. If None, all stages run.
+        use_cache: Reuse cached intermediate results for this file, if any
+        
+    Returns:
+        Path to the processed output file
+
+    Raises:
+        ValidationError: If policy is "reject" and the file fails validation
+    """
+    file_path = Path(file_path)
+    processed_df = process_file(file_path, data_type, policy, outputs, use_cache)
+    return save_output(processed_df, data_type, file_path.stem)
+
+
+def save_output(processed_df: pd.DataFrame, data_type: str, source_name: str) -> Path:
+    """Save a processed file under the output name for its data type."""
+    output_name = OUTPUT_NAMES.get(data_type, "custom_data.csv")
+    return save_processed(processed_df, output_name, data_type, source_name)
+
+
+def series_name(file_path: Path) -> str:
+    """Return the {description} part of a {type}_{description}_{date}.csv filename."""
+    parts = Path(file_path).stem.split('_')
+    return "_".join(parts[1:-1]) or DEFAULT_SERIES
+
+
+def detect_data_type(file_path: Path) -> str:
+    """Determine the data type from a {type}_{description}_{date}.csv filename."""
+    parts = Path(file_path).stem.split('_')
+    if len(parts) >= 1 and parts[0] in DATA_TYPES:
         data_type = parts[0]
         logger.info(f"Detected data type from filename: {data_type}")
     else:
         data_type = "unknown"
         logger.info("Could not determine data type from filename, using default processing")
-    
-    # Process the file based on its type
-    output_file = process_file_by_type(latest, data_type)
-    logger.info(f"Processed data saved to {output_file}")
+    return data_type
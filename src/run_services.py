@@ -8,8 +8,11 @@ import threading
 import time
 import signal
 import sys
+import urllib.request
 from pathlib import Path
 
+API_READY_URL = "http://localhost:8000/data/types"
+
 def run_api_server():
     """Run the FastAPI server"""
     print("Starting API server...")
@@ -26,8 +29,20 @@ def run_dashboard():
         env=dict(os.environ, PYTHONPATH=str(Path.cwd()))
     )
 
+def wait_for_api(process, timeout=30.0, interval=0.1):
+    """Poll the API until it responds, the process exits, or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(API_READY_URL, timeout=1):
+                return True
+        except OSError:
+            time.sleep(interval)
+    return False
+
 def main():
     """Start all services and handle graceful shutdown"""
+    api_process = dashboard_process = None
     try:
         # Create necessary directories
         from src.utils.paths import get_data_path
@@ -36,11 +51,12 @@ def main():
         raw_dir.mkdir(parents=True, exist_ok=True)
         processed_dir.mkdir(parents=True, exist_ok=True)
         
-        # Start the services
+        # Start the services; the dashboard does not depend on the API,
+        # so both start at once and we only wait to report readiness
         api_process = run_api_server()
-        # Give the API a moment to start
-        time.sleep(2)
         dashboard_process = run_dashboard()
+        if not wait_for_api(api_process):
+            print("Warning: API did not become ready, check its output above")
         
         print("\n" + "="*50)
         print(" Services running! Access them at:")
@@ -0,0 +1,285 @@
+"""
+Monte Carlo scenario engine for forecast data.
+
+Simulated paths are built around the processed forecast: the step-to-step
+changes of the historical part of the series are centered and bootstrapped
+onto the forecast horizon, and every path gets its own drift and volatility
+shock. Paths are generated in fixed-size batches of NumPy array operations,
+each with its own child seed, so results are reproducible for a given seed
+no matter how many threads are used.
+
+With ``n_jobs > 1`` batches run in a thread pool and write straight into
+one shared output array. NumPy releases the GIL in the sampling, indexing,
+arithmetic and sorting kernels, so the threads use several cores without
+copying paths between processes.
+"""
+
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .stages import file_hash
+from .utils.logs import configure_logging
+from .utils.paths import get_data_path, get_latest_processed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Paths per batch. Batches, not workers, own the random streams.
+BATCH_SIZE = 1000
+
+
+def _simulate_batch(
+    baseline: np.ndarray,
+    residuals: np.ndarray,
+    drift_shock: float,
+    vol_shock: float,
+    seed: np.random.SeedSequence,
+    out: np.ndarray,
+) -> None:
+    """Simulate one batch of paths into ``out``, an (n_paths, horizon) array."""
+    rng = np.random.default_rng(seed)
+    n_paths, horizon = out.shape
+    scale = residuals.std() or 1.0
+
+    np.take(residuals, rng.integers(0, len(residuals), size=(n_paths, horizon)), out=out)
+    # Per-path shocks: a mean-one volatility multiplier and a constant drift
+    vol = np.exp(rng.normal(-0.5 * vol_shock ** 2, vol_shock, size=(n_paths, 1)))
+    drift = rng.normal(0.0, drift_shock * scale, size=(n_paths, 1))
+
+    out *= vol
+    out += drift
+    np.cumsum(out, axis=1, out=out)
+    out += baseline
+
+
+def simulate_paths(
+    baseline: np.ndarray,
+    history: np.ndarray,
+    n_paths: int = 10000,
+    drift_shock: float = 0.1,
+    vol_shock: float = 0.2,
+    seed: Optional[int] = None,
+    n_jobs: int = 1,
+) -> np.ndarray:
+    """
+    Simulate paths around a baseline forecast.
+
+    Args:
+        baseline: Forecast values over the horizon
+        history: Historical values used to estimate step residuals; missing
+            values are skipped
+        n_paths: Number of paths to simulate
+        drift_shock: Std dev of the per-path drift, in units of the residual std dev
+        vol_shock: Std dev of the per-path log volatility multiplier
+        seed: Seed for reproducible results
+        n_jobs: Number of threads; 1 runs in the calling thread
+
+    Returns:
+        Array of shape (n_paths, len(baseline))
+    """
+    baseline = np.asarray(baseline, dtype=float)
+    history = np.asarray(history, dtype=float)
+    history = history[~np.isnan(history)]
+    if len(history) < 3:
+        raise ValueError("At least 3 historical values are needed to estimate residuals")
+
+    diffs = np.diff(history)
+    residuals = diffs - diffs.mean()
+
+    paths = np.empty((n_paths, len(baseline)))
+    starts = range(0, n_paths, BATCH_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+
+    def run(start: int, batch_seed: np.random.SeedSequence) -> None:
+        _simulate_batch(baseline, residuals, drift_shock, vol_shock, batch_seed,
+                        paths[start:start + BATCH_SIZE])
+
+    _map(run, starts, seeds, n_jobs=n_jobs)
+    return paths
+
+
+def _map(func, *iterables, n_jobs: int = 1) -> None:
+    """Call ``func`` over ``iterables`` in ``n_jobs`` threads, re-raising any error."""
+    if n_jobs == 1:
+        for args in zip(*iterables):
+            func(*args)
+        return
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        # list() surfaces exceptions raised in the threads
+        list(pool.map(func, *iterables))
+
+
+def _percentiles(paths: np.ndarray, percentiles: Sequence[float], n_jobs: int = 1) -> np.ndarray:
+    """
+    Linear-interpolated percentiles per step, as a (len(percentiles), horizon) array.
+
+    Matches ``np.percentile(paths, percentiles, axis=0)`` but sorts each step's
+    values once in contiguous memory, which is several times faster. Chunks
+    of steps are sorted in ``n_jobs`` threads.
+    """
+    position = np.asarray(percentiles, dtype=float) / 100 * (paths.shape[0] - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.ceil(position).astype(int)
+    frac = position - lower
+
+    horizon = paths.shape[1]
+    result = np.empty((len(position), horizon))
+    chunk = -(-horizon // n_jobs)
+
+    def run(start: int) -> None:
+        by_step = np.sort(paths[:, start:start + chunk].T, axis=1)
+        result[:, start:start + chunk] = (by_step[:, lower] * (1 - frac) + by_step[:, upper] * frac).T
+
+    _map(run, range(0, horizon, chunk), n_jobs=n_jobs)
+    return result
+
+
+def percentile_bands(
+    df: pd.DataFrame,
+    n_paths: int = 10000,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    drift_shock: float = 0.1,
+    vol_shock: float = 0.2,
+    seed: Optional[int] = None,
+    n_jobs: int = 1,
+) -> Optional[pd.DataFrame]:
+    """
+    Simulate scenarios for a processed forecast and summarise them as bands.
+
+    Args:
+        df: Processed forecast data with 'date' and 'prediction' columns
+        n_paths: Number of paths to simulate
+        percentiles: Percentiles to report for each future date
+        drift_shock: See ``simulate_paths``
+        vol_shock: See ``simulate_paths``
+        seed: Seed for reproducible results
+        n_jobs: Number of threads
+
+    Returns:
+        DataFrame with 'date', 'mean' and one 'p{N}' column per percentile,
+        or None if there is no future horizon or too little history
+    """
+    df = df.sort_values("date")
+    dates = pd.to_datetime(df["date"])
+    today = pd.Timestamp.now().normalize()
+    historical = df.loc[dates <= today, "prediction"].to_numpy()
+    forecast = df.loc[dates > today]
+
+    if forecast.empty:
+        logger.warning("Forecast data contains no future dates, skipping scenarios")
+        return None
+
+    # Missing values would turn every residual, or a whole band step, into NaN
+    missing_history = int(np.isnan(historical).sum())
+    if missing_history:
+        logger.warning(f"Skipping {missing_history} missing historical values")
+        historical = historical[~np.isnan(historical)]
+    missing_forecast = int(forecast["prediction"].isna().sum())
+    if missing_forecast:
+        logger.warning(f"Skipping {missing_forecast} forecast dates without a prediction")
+        forecast = forecast[forecast["prediction"].notna()]
+        if forecast.empty:
+            return None
+    if len(historical) < 3:
+        logger.warning("Not enough historical data to simulate scenarios")
+        return None
+
+    logger.info(f"Simulating {n_paths} paths over {len(forecast)} steps")
+    paths = simulate_paths(
+        forecast["prediction"].to_numpy(),
+        historical,
+        n_paths=n_paths,
+        drift_shock=drift_shock,
+        vol_shock=vol_shock,
+        seed=seed,
+        n_jobs=n_jobs,
+    )
+
+    bands = pd.DataFrame({"date": pd.to_datetime(forecast["date"]).to_numpy()})
+    bands["mean"] = paths.mean(axis=0)
+    for p, values in zip(percentiles, _percentiles(paths, percentiles, n_jobs)):
+        bands[f"p{p:g}"] = values
+    return bands
+
+
+def bands_filename(source_hash: str) -> str:
+    """Name of the bands file for a processed forecast file hash."""
+    return f"scenarios_{source_hash[:16]}_forecast_bands.csv"
+
+
+def save_bands(bands: pd.DataFrame, source_hash: str) -> Path:
+    """
+    Save percentile bands to the processed directory.
+
+    Files use a ``scenarios_`` prefix so they are not mistaken for the
+    latest forecast data. The hash of the forecast file they were simulated
+    from is stored in the name and in a ``source`` column, so the dashboard
+    looks bands up directly and only draws those that belong to the forecast
+    it shows. Rerunning for the same forecast replaces its bands.
+    """
+    out_dir = get_data_path("processed")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / bands_filename(source_hash)
+    logger.info(f"Saving scenario bands to {out_file}")
+    tmp_file = out_file.with_name(f".{out_file.name}.tmp")
+    bands.assign(source=source_hash).to_csv(tmp_file, index=False)
+    tmp_file.replace(out_file)
+    return out_file
+
+
+def run_scenarios(
+    n_paths: int = 10000,
+    seed: Optional[int] = None,
+    n_jobs: int = 1,
+    drift_shock: float = 0.1,
+    vol_shock: float = 0.2,
+) -> Optional[Path]:
+    """Simulate scenarios for the latest processed forecast and save the bands."""
+    latest = get_latest_processed("forecast")
+    if latest is None:
+        logger.warning("No processed forecast data found")
+        return None
+
+    logger.info(f"Running scenarios for {latest}")
+    bands = percentile_bands(
+        pd.read_csv(latest),
+        n_paths=n_paths,
+        drift_shock=drift_shock,
+        vol_shock=vol_shock,
+        seed=seed,
+        n_jobs=n_jobs,
+    )
+    if bands is None:
+        return None
+    return save_bands(bands, file_hash(latest))
+
+
+def main() -> None:
+    """Command-line entry point for scenario simulation."""
+    parser = argparse.ArgumentParser(description="Simulate forecast scenarios")
+    parser.add_argument("--paths", type=int, default=10000, help="Number of simulated paths")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of threads")
+    parser.add_argument("--drift-shock", type=float, default=0.1, help="Per-path drift shock")
+    parser.add_argument("--vol-shock", type=float, default=0.2, help="Per-path volatility shock")
+    args = parser.parse_args()
+
+    configure_logging()
+    run_scenarios(
+        n_paths=args.paths,
+        seed=args.seed,
+        n_jobs=args.jobs,
+        drift_shock=args.drift_shock,
+        vol_shock=args.vol_shock,
+    )
+
+
+if __name__ == "__main__":
+    main()
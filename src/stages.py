@@ -0,0 +1,351 @@
+"""
+Lazy stage graph for the data pipeline.
+
+Processing steps are registered per data type as ``Stage`` objects. Nothing
+runs at registration time; ``plan`` works out which stages are needed for the
+requested output columns and ``execute`` runs them:
+
+- ``frame`` stages take and return a whole DataFrame (cleaning, sorting, ...)
+  and always run.
+- ``column`` stages return a mapping of new columns. Adjacent column stages
+  are fused into one group that works on a single copy of the frame, and are
+  skipped entirely when none of their outputs are requested.
+
+When a cache key for the source is given, the result of every frame stage
+and fused group is cached on disk under a key chained from the source key
+and each stage's name and version. Bumping a stage's version therefore only
+invalidates that stage and the ones after it. Stages registered with
+``cache=False`` depend on state outside the frame; they and every stage
+after them run on every call. The cache is pruned to
+``CACHE_MAX_BYTES`` and ``CACHE_MAX_AGE`` after every write, least recently
+used first; ``python -m src.stages --clear`` empties it.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .utils.paths import get_data_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TYPE = "default"
+STAGE_KINDS = ("frame", "column")
+
+# Cache bounds, enforced after every write
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+CACHE_MAX_AGE = 7 * 24 * 3600
+
+# data type -> ordered stages
+STAGES: Dict[str, List["Stage"]] = {}
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A single registered processing step."""
+
+    name: str
+    func: Callable[[pd.DataFrame, dict], object]
+    kind: str = "frame"
+    requires: Tuple[str, ...] = ()
+    provides: Tuple[str, ...] = ()
+    version: str = "1"
+    cache: bool = True
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}@{self.version}"
+
+
+def register_stage(
+    data_types: Iterable[str],
+    kind: str = "frame",
+    requires: Iterable[str] = (),
+    provides: Iterable[str] = (),
+    version: str = "1",
+    name: Optional[str] = None,
+    cache: bool = True,
+):
+    """
+    Decorator registering a function as a stage for one or more data types.
+
+    Frame stages are called as ``func(df, context)`` and return a DataFrame.
+    Column stages are called the same way and return ``{column: values}``.
+
+    Args:
+        data_types: Data types the stage applies to ("default" for unknown types)
+        kind: "frame" or "column"
+        requires: Columns the stage reads; it is skipped with a warning if absent
+        provides: Columns a column stage adds
+        version: Bump when the stage logic changes to invalidate cached results
+        name: Stage name, defaults to the function name
+        cache: False if the result depends on anything besides the input
+            frame (e.g. persisted state), so it must never be reused
+    """
+    if kind not in STAGE_KINDS:
+        raise ValueError(f"Invalid stage kind: {kind}. Use one of {', '.join(STAGE_KINDS)}.")
+    if isinstance(data_types, str):
+        data_types = [data_types]
+
+    def decorator(func):
+        stage = Stage(
+            name=name or func.__name__,
+            func=func,
+            kind=kind,
+            requires=tuple(requires),
+            provides=tuple(provides),
+            version=str(version),
+            cache=cache,
+        )
+        for data_type in data_types:
+            stages = STAGES.setdefault(data_type, [])
+            if any(s.name == stage.name for s in stages):
+                raise ValueError(f"Stage {stage.name} already registered for {data_type}")
+            stages.append(stage)
+        return func
+
+    return decorator
+
+
+def get_stages(data_type: str) -> List[Stage]:
+    """Return the stages registered for a data type, falling back to the default."""
+    return STAGES.get(data_type) or STAGES.get(DEFAULT_TYPE, [])
+
+
+def plan(data_type: str, outputs: Optional[Iterable[str]] = None) -> List[List[Stage]]:
+    """
+    Work out which stages to run and how to group them.
+
+    Args:
+        data_type: Type of data to plan for
+        outputs: Columns that must be produced. If None, every stage runs.
+
+    Returns:
+        List of execution units: a single frame stage, or a fused group of
+        adjacent column stages.
+    """
+    stages = get_stages(data_type)
+
+    if outputs is not None:
+        needed = set(outputs)
+        selected = []
+        for stage in reversed(stages):
+            if stage.kind == "column" and not needed.intersection(stage.provides):
+                continue
+            needed.update(stage.requires)
+            selected.append(stage)
+        stages = list(reversed(selected))
+
+    units: List[List[Stage]] = []
+    for stage in stages:
+        if stage.kind == "column" and units and units[-1][0].kind == "column":
+            units[-1].append(stage)
+        else:
+            units.append([stage])
+    return units
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _chain_key(parent: str, unit: List[Stage]) -> str:
+    signature = "|".join(stage.signature for stage in unit)
+    return hashlib.sha256(f"{parent}:{signature}".encode()).hexdigest()
+
+
+def _cache_file(key: str) -> Path:
+    return get_data_path("cache") / f"{key}.pkl"
+
+
+def load_cached(key: str):
+    """Return the object cached under ``key``, or None if absent or unreadable."""
+    cached = _cache_file(hashlib.sha256(key.encode()).hexdigest())
+    return _read_cache(cached)
+
+
+def save_cached(key: str, obj) -> None:
+    """Cache an arbitrary picklable object under ``key``."""
+    _write_cache(_cache_file(hashlib.sha256(key.encode()).hexdigest()), obj)
+    prune_cache()
+
+
+def _read_cache(cached: Path):
+    if not cached.exists():
+        return None
+    try:
+        obj = pd.read_pickle(cached)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache file {cached}: {str(e)}")
+        return None
+    # Mark as recently used for pruning
+    try:
+        os.utime(cached)
+    except OSError:
+        pass
+    return obj
+
+
+def _write_cache(cache_file: Path, obj) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so concurrent runs never read a partial file
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    pd.to_pickle(obj, tmp_file)
+    os.replace(tmp_file, cache_file)
+
+
+def prune_cache(max_bytes: int = CACHE_MAX_BYTES, max_age: float = CACHE_MAX_AGE) -> int:
+    """
+    Evict cached results older than ``max_age`` seconds, then the least
+    recently used ones until the cache fits in ``max_bytes``.
+
+    Returns:
+        Number of files removed
+    """
+    entries = []
+    for cached in get_data_path("cache").glob("*.pkl"):
+        try:
+            st = cached.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, cached))
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, cached in sorted(entries):
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            cached.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"Pruned {removed} cached result(s)")
+    return removed
+
+
+def _missing(stage: Stage, df: pd.DataFrame) -> List[str]:
+    return [col for col in stage.requires if col not in df.columns]
+
+
+def _run_unit(unit: List[Stage], df: pd.DataFrame, context: dict) -> pd.DataFrame:
+    if unit[0].kind == "frame":
+        stage = unit[0]
+        missing = _missing(stage, df)
+        if missing:
+            logger.warning(f"Skipping stage {stage.name}: missing columns {', '.join(missing)}")
+            return df
+        return stage.func(df, context)
+
+    # Fused column stages share one copy of the frame
+    df = df.copy()
+    for stage in unit:
+        missing = _missing(stage, df)
+        if missing:
+            logger.warning(f"Skipping stage {stage.name}: missing columns {', '.join(missing)}")
+            continue
+        for column, values in stage.func(df, context).items():
+            df[column] = values
+    return df
+
+
+def execute(
+    data_type: str,
+    load: Callable[[], pd.DataFrame],
+    source_key: Optional[str] = None,
+    outputs: Optional[Iterable[str]] = None,
+    context: Optional[dict] = None,
+) -> pd.DataFrame:
+    """
+    Run the stage graph for a data type.
+
+    Args:
+        data_type: Type of data, used to select the registered stages
+        load: Callable returning the input DataFrame. Only called if no
+            cached intermediate result can be reused.
+        source_key: Key identifying the input (e.g. file hash plus options).
+            Caching is disabled when this is None.
+        outputs: Columns that must be produced; stages that only produce
+            other columns are skipped. If None, every stage runs.
+        context: Extra values passed to every stage
+
+    Returns:
+        The processed DataFrame
+    """
+    units = plan(data_type, outputs)
+    context = dict(context or {}, data_type=data_type)
+
+    keys: List[str] = []
+    if source_key is not None:
+        parent = hashlib.sha256(f"{data_type}:{source_key}".encode()).hexdigest()
+        for unit in units:
+            # Nothing from a non-cacheable stage onwards can be reused
+            if not all(stage.cache for stage in unit):
+                break
+            parent = _chain_key(parent, unit)
+            keys.append(parent)
+
+    # Resume from the deepest cached result, if any
+    start = 0
+    df = None
+    for i in range(len(keys) - 1, -1, -1):
+        df = _read_cache(_cache_file(keys[i]))
+        if df is not None:
+            start = i + 1
+            logger.info(f"Reusing cached result of {len(units[:start])} stage group(s) for {data_type}")
+            break
+
+    if df is None:
+        df = load()
+
+    for i in range(start, len(units)):
+        unit = units[i]
+        logger.debug(f"Running stage group {[stage.name for stage in unit]}")
+        df = _run_unit(unit, df, context)
+        if i < len(keys):
+            _write_cache(_cache_file(keys[i]), df)
+
+    if start < len(keys):
+        prune_cache()
+    return df
+
+
+def clear_cache() -> int:
+    """Delete all cached intermediate results. Returns the number of files removed."""
+    cache_dir = get_data_path("cache")
+    removed = 0
+    for cached in cache_dir.glob("*.pkl"):
+        cached.unlink()
+        removed += 1
+    return removed
+
+
+def main() -> None:
+    """Command-line entry point for cache maintenance."""
+    parser = argparse.ArgumentParser(description="Manage the pipeline stage cache")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--clear", action="store_true", help="Delete all cached results")
+    group.add_argument("--prune", action="store_true", help="Apply the size and age bounds now")
+    args = parser.parse_args()
+
+    removed = clear_cache() if args.clear else prune_cache()
+    print(f"Removed {removed} cached result(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Lock files for state shared between processes and hosts on the data volume.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def file_lock(path, timeout=60.0, stale=300.0, poll_interval=0.05):
+    """
+    Hold an exclusive lock file for the duration of a ``with`` block.
+
+    The lock is taken by creating ``path`` with ``O_CREAT | O_EXCL``. A lock
+    file older than ``stale`` seconds is assumed to belong to a crashed
+    process and is removed.
+
+    Args:
+        path: Path of the lock file
+        timeout: Seconds to wait for the lock before giving up
+        stale: Age in seconds after which an existing lock is broken
+        poll_interval: Seconds between attempts
+
+    Raises:
+        TimeoutError: If the lock could not be taken within ``timeout``
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - path.stat().st_mtime > stale:
+                    logger.warning(f"Breaking stale lock {path}")
+                    path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for lock {path}")
+            time.sleep(poll_interval)
+
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield path
+    finally:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
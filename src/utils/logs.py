@@ -0,0 +1,12 @@
+"""
+Logging setup shared by the command-line entry points.
+"""
+
+import logging
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def configure_logging(level=logging.INFO):
+    """Configure root logging for an entry point. Does nothing if already configured."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
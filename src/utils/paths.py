@@ -16,22 +16,47 @@ def get_data_path(subfolder=None):
     
     Args:
         subfolder (str, optional): Subdirectory within the data directory.
-            Can be 'raw', 'processed', or 'external'. Defaults to None.
+            Can be 'raw', 'processed', 'quarantine', 'cache', 'state', 'spool', or 'external'. Defaults to None.
             
     Returns:
         Path: Path object pointing to the requested directory
+
+    The FLSD_DATA_DIR environment variable, if set, replaces the project's
+    data directory, e.g. to keep load tests away from real data.
     """
-    root = get_project_root()
-    data_path = root / 'data'
+    data_dir = os.environ.get('FLSD_DATA_DIR')
+    data_path = Path(data_dir) if data_dir else get_project_root() / 'data'
     
     if subfolder:
-        if subfolder in ['raw', 'processed', 'external']:
+        if subfolder in ['raw', 'processed', 'quarantine', 'cache', 'state', 'spool', 'external']:
             return data_path / subfolder
         else:
-            raise ValueError(f"Invalid subfolder: {subfolder}. Use 'raw', 'processed', or 'external'.")
+            raise ValueError(f"Invalid subfolder: {subfolder}. Use 'raw', 'processed', 'quarantine', 'cache', 'state', 'spool', or 'external'.")
     
     return data_path
 
+def get_latest_pointer(data_type):
+    """Return the file naming the newest processed output of a data type."""
+    return get_data_path('processed') / f'latest_{data_type}.txt'
+
+def get_latest_processed(data_type):
+    """
+    Return the newest processed file for a data type, or None if there is none.
+
+    Reads the pointer the pipeline writes next to latest.csv, so the cost
+    does not grow with the number of processed files. Falls back to scanning
+    the directory when there is no pointer yet.
+    """
+    processed_dir = get_data_path('processed')
+    try:
+        latest = processed_dir / get_latest_pointer(data_type).read_text().strip()
+        if latest.is_file():
+            return latest
+    except FileNotFoundError:
+        pass
+    files = list(processed_dir.glob(f"{data_type}_*.csv"))
+    return max(files, key=lambda p: p.stat().st_mtime) if files else None
+
 def get_notebooks_path():
     """Return the path to the notebooks directory."""
     return get_project_root() / 'notebooks'
@@ -0,0 +1,237 @@
+"""
+Declarative, vectorized validation for the data pipeline.
+
+Each data type declares a schema of column rules. ``validate`` parses every
+column once, evaluates all rules as whole-column operations and applies one
+of the supported policies:
+
+- ``reject``: raise ``ValidationError`` if any row fails.
+- ``quarantine``: drop failing rows and return them separately.
+- ``coerce``: null out failing cells and keep the row; rows failing a
+  non-nullable column are dropped, since no value can stand in for them.
+
+NumPy and pandas are imported on first use so the API can import the
+policies and ``ValidationError`` without paying for them at startup.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("reject", "quarantine", "coerce")
+DEFAULT_POLICY = "quarantine"
+
+# Number of offending row indices kept per rule in the report
+SAMPLE_SIZE = 10
+
+
+@dataclass(frozen=True)
+class ColumnRule:
+    """Expected type and bounds for a single column."""
+
+    column: str
+    dtype: str  # "datetime" or "numeric"
+    required: bool = True
+    nullable: bool = True
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+
+
+SCHEMAS: Dict[str, List[ColumnRule]] = {
+    "financial": [
+        ColumnRule("date", "datetime", nullable=False),
+        ColumnRule("amount", "numeric"),
+    ],
+    "market": [
+        ColumnRule("date", "datetime", nullable=False),
+        ColumnRule("price", "numeric", min_value=0),
+        ColumnRule("open", "numeric", required=False, min_value=0),
+        ColumnRule("high", "numeric", required=False, min_value=0),
+        ColumnRule("low", "numeric", required=False, min_value=0),
+        ColumnRule("close", "numeric", required=False, min_value=0),
+        ColumnRule("volume", "numeric", required=False, min_value=0),
+    ],
+    "forecast": [
+        ColumnRule("date", "datetime", nullable=False),
+        ColumnRule("prediction", "numeric"),
+        ColumnRule("confidence", "numeric", required=False, min_value=0, max_value=1),
+    ],
+}
+
+
+def schema_columns(data_type: str) -> List[str]:
+    """Return the columns validated for a data type."""
+    return [rule.column for rule in SCHEMAS.get(data_type, [])]
+
+
+def schema_fingerprint(data_type: str) -> str:
+    """Return a short hash of a data type's rules, for use in cache keys."""
+    rules = repr(SCHEMAS.get(data_type, []))
+    return hashlib.sha256(rules.encode()).hexdigest()[:16]
+
+
+@dataclass
+class ValidationReport:
+    """Compact summary of a validation pass."""
+
+    data_type: str
+    policy: str
+    total_rows: int = 0
+    invalid_rows: int = 0
+    missing_columns: List[str] = field(default_factory=list)
+    # rule name -> {"count": int, "sample_rows": [int, ...]}
+    errors: Dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing_columns and self.invalid_rows == 0
+
+    def to_dict(self) -> dict:
+        return {
+            "data_type": self.data_type,
+            "policy": self.policy,
+            "total_rows": self.total_rows,
+            "invalid_rows": self.invalid_rows,
+            "missing_columns": list(self.missing_columns),
+            "errors": self.errors,
+        }
+
+    def summary(self) -> str:
+        parts = [f"{name}={info['count']}" for name, info in self.errors.items()]
+        if self.missing_columns:
+            parts.append(f"missing_columns={','.join(self.missing_columns)}")
+        detail = "; ".join(parts) if parts else "no errors"
+        return (f"{self.data_type} validation ({self.policy}): "
+                f"{self.invalid_rows}/{self.total_rows} invalid rows - {detail}")
+
+
+class ValidationError(ValueError):
+    """Raised by the ``reject`` policy when data fails validation."""
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(report.summary())
+        self.report = report
+
+
+def _parse(series: "pd.Series", dtype: str) -> "pd.Series":
+    """Convert a column to its declared type, turning bad values into nulls."""
+    import pandas as pd
+
+    if dtype == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return pd.to_datetime(series, errors="coerce")
+    if dtype == "numeric":
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return series
+        return pd.to_numeric(series, errors="coerce")
+    raise ValueError(f"Unsupported rule dtype: {dtype}")
+
+
+def _record(report: ValidationReport, name: str, mask: "np.ndarray", index: "pd.Index") -> None:
+    import numpy as np
+
+    count = int(mask.sum())
+    if count:
+        report.errors[name] = {
+            "count": count,
+            "sample_rows": index[np.flatnonzero(mask)[:SAMPLE_SIZE]].tolist(),
+        }
+
+
+def validate(
+    df: "pd.DataFrame",
+    data_type: str,
+    policy: str = DEFAULT_POLICY,
+) -> Tuple["pd.DataFrame", "pd.DataFrame", ValidationReport]:
+    """
+    Validate a raw dataframe against the schema for its data type.
+
+    Args:
+        df: The raw dataframe as loaded from CSV
+        data_type: Type of data, used to select the schema
+        policy: One of ``reject``, ``quarantine`` or ``coerce``
+
+    Returns:
+        Tuple of (valid rows with parsed columns, rejected rows, report).
+        Data types without a schema pass through unchanged.
+
+    Raises:
+        ValidationError: If ``policy`` is ``reject`` and any check fails
+    """
+    import numpy as np
+
+    if policy not in POLICIES:
+        raise ValueError(f"Invalid validation policy: {policy}. Use one of {', '.join(POLICIES)}.")
+
+    report = ValidationReport(data_type=data_type, policy=policy, total_rows=len(df))
+    rules = SCHEMAS.get(data_type)
+    if not rules:
+        return df, df.iloc[0:0], report
+
+    raw_df = df
+    # Shallow: only the schema columns are replaced below, so the others can
+    # share memory with the raw frame instead of doubling peak usage
+    df = df.copy(deep=False)
+    index = df.index
+    invalid = np.zeros(len(df), dtype=bool)
+    drop = np.zeros(len(df), dtype=bool)
+
+    for rule in rules:
+        if rule.column not in df.columns:
+            if rule.required:
+                report.missing_columns.append(rule.column)
+            continue
+
+        raw = df[rule.column]
+        parsed = _parse(raw, rule.dtype)
+        is_null = parsed.isna().to_numpy()
+        unparseable = is_null & raw.notna().to_numpy()
+        _record(report, f"{rule.column}:unparseable", unparseable, index)
+        bad = unparseable
+
+        if not rule.nullable:
+            missing = is_null & ~unparseable
+            _record(report, f"{rule.column}:null", missing, index)
+            bad = bad | missing
+
+        out_of_range = np.zeros(len(df), dtype=bool)
+        if rule.min_value is not None:
+            below = (parsed < rule.min_value).to_numpy()
+            _record(report, f"{rule.column}:below_min", below, index)
+            out_of_range |= below
+        if rule.max_value is not None:
+            above = (parsed > rule.max_value).to_numpy()
+            _record(report, f"{rule.column}:above_max", above, index)
+            out_of_range |= above
+        bad = bad | out_of_range
+
+        if policy == "coerce" and out_of_range.any():
+            parsed = parsed.mask(out_of_range)
+        if not rule.nullable:
+            drop |= bad
+        df[rule.column] = parsed
+        invalid |= bad
+
+    report.invalid_rows = int(invalid.sum())
+
+    if policy == "reject":
+        if not report.ok:
+            raise ValidationError(report)
+        return df, df.iloc[0:0], report
+
+    if report.missing_columns:
+        logger.warning(f"{data_type} data missing required columns: {', '.join(report.missing_columns)}")
+
+    rejected_mask = invalid if policy == "quarantine" else drop
+    if not rejected_mask.any():
+        return df, df.iloc[0:0], report
+    # Rejected rows keep their original values so they can be inspected and fixed
+    return df[~rejected_mask], raw_df[rejected_mask], report
@@ -0,0 +1,437 @@
+"""
+Pipeline workers pulling raw files from a shared spool directory.
+
+Any number of worker processes, on one or several hosts sharing the data
+volume, can run ``flsd-worker`` against the same spool::
+
+    spool/
+      incoming/  # raw CSVs waiting to be processed, each with an optional
+                 # {name}.json of per-file options such as the policy
+      leases/    # one lease file per file being processed
+      done/      # processed raw files
+      rejected/  # files refused as invalid input (validation, overlapping
+                 # market rows), with a .error file next to them
+      failed/    # files that failed, with a .error file next to them
+
+A worker claims a file by creating its lease with ``O_CREAT | O_EXCL``, which
+only one worker can win. While processing, a heartbeat thread touches the
+lease; a lease whose mtime is older than the TTL belongs to a crashed worker
+and is reclaimed by the next worker that finds it. Lease ages are measured
+against a probe file touched on the same volume, so clock skew between hosts
+does not matter. A worker checks that it
+still holds the lease before publishing its result and before moving the
+file, and abandons the file otherwise, leaving it to the worker that
+reclaimed it. Results are published into the processed directory as usual.
+
+Files of the types in ``SERIAL_TYPES`` carry state from one file to the next
+(the market indicators), so they are processed one at a time in spool order:
+a worker only tries the oldest waiting file of such a type, and skips the
+type while another worker holds it.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+from .utils.logs import configure_logging
+from .utils.paths import get_data_path
+from .validation import DEFAULT_POLICY, POLICIES, ValidationError
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUBDIRS = ("incoming", "leases", "done", "rejected", "failed")
+DEFAULT_LEASE_TTL = 60.0
+DEFAULT_HEARTBEAT = 10.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+# Data types whose files must be processed one at a time, oldest first
+SERIAL_TYPES = ("market",)
+
+
+def spool_dirs(spool_dir: Optional[Path] = None) -> dict:
+    """Return (and create) the spool subdirectories."""
+    root = Path(spool_dir) if spool_dir else get_data_path("spool")
+    dirs = {name: root / name for name in SPOOL_SUBDIRS}
+    for path in dirs.values():
+        path.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+
+def _sidecar(path: Path) -> Path:
+    """Return the options file stored next to a spooled file."""
+    return path.with_name(f"{path.name}.json")
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_file.write_bytes(content)
+    os.replace(tmp_file, path)
+
+
+def enqueue(
+    content: bytes,
+    filename: str,
+    spool_dir: Optional[Path] = None,
+    policy: Optional[str] = None,
+) -> Path:
+    """
+    Add a raw file to the spool for workers to process.
+
+    The file is written under a temporary name and renamed into place so
+    workers never pick up a partial file.
+
+    Args:
+        content: Raw CSV bytes
+        filename: Name of the file in the spool
+        spool_dir: Spool root, defaults to data/spool
+        policy: Validation policy for this file; the worker's own policy
+            is used if None
+    """
+    incoming = spool_dirs(spool_dir)["incoming"]
+    target = incoming / filename
+    # Options go in first so a worker never sees the file without them
+    if policy is not None:
+        _write_atomic(_sidecar(target), json.dumps({"policy": policy}).encode())
+    _write_atomic(target, content)
+    return target
+
+
+def _options(path: Path) -> dict:
+    """Read the per-file options stored with a spooled file, if any."""
+    try:
+        return json.loads(_sidecar(path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+class Lease:
+    """An exclusive, expiring claim on a spooled file."""
+
+    def __init__(self, path: Path, token: str, ttl: float):
+        self.path = path
+        self.token = token
+        self.ttl = ttl
+
+    @classmethod
+    def acquire(cls, lease_dir: Path, name: str, worker_id: str, ttl: float) -> Optional["Lease"]:
+        """Try to claim ``name``. Returns None if another live worker holds it."""
+        path = lease_dir / f"{name}.lease"
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+        # Second attempt only happens after reclaiming an expired lease
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not _reclaim_expired(path, ttl, worker_id):
+                    return None
+                continue
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "token": token,
+                    "host": socket.gethostname(),
+                    "pid": os.getpid(),
+                    "acquired": time.time(),
+                }, f)
+            return cls(path, token, ttl)
+        return None
+
+    def owned(self) -> bool:
+        """Return True if the lease file still belongs to this worker."""
+        try:
+            return json.loads(self.path.read_text()).get("token") == self.token
+        except (OSError, ValueError):
+            return False
+
+    def heartbeat(self) -> bool:
+        """Extend the lease. Returns False if it was lost."""
+        if not self.owned():
+            return False
+        os.utime(self.path)
+        return True
+
+    def release(self) -> None:
+        if self.owned():
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _volume_time(directory: Path, worker_id: str) -> float:
+    """
+    Return the current time as stamped by the volume holding ``directory``.
+
+    Lease mtimes are set by the file server, not by the host that touched
+    them, so ages must be measured on the same clock.
+    """
+    probe = directory / f".clock.{worker_id}.{uuid.uuid4().hex}"
+    probe.touch()
+    try:
+        return probe.stat().st_mtime
+    finally:
+        probe.unlink(missing_ok=True)
+
+
+def _reclaim_expired(path: Path, ttl: float, worker_id: str) -> bool:
+    """Remove a lease whose heartbeat is older than ``ttl``. Returns True if gone."""
+    try:
+        if _volume_time(path.parent, worker_id) - path.stat().st_mtime < ttl:
+            return False
+    except FileNotFoundError:
+        return True
+
+    # Renaming is atomic, so only one worker wins the reclaim
+    tombstone = path.with_name(f"{path.name}.{worker_id}.expired")
+    try:
+        os.rename(path, tombstone)
+    except FileNotFoundError:
+        return True
+
+    # Another worker may have replaced the lease between stat and rename;
+    # if what we moved is fresh, put it back
+    try:
+        if _volume_time(path.parent, worker_id) - tombstone.stat().st_mtime < ttl:
+            try:
+                os.link(tombstone, path)
+            except FileExistsError:
+                pass
+            return False
+        logger.warning(f"Reclaimed expired lease {path.name}")
+        return True
+    finally:
+        tombstone.unlink(missing_ok=True)
+
+
+class _Heartbeat(threading.Thread):
+    """Background thread keeping a lease alive while a file is processed."""
+
+    def __init__(self, lease: Lease, interval: float):
+        super().__init__(daemon=True)
+        self.lease = lease
+        self.interval = interval
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            if not self.lease.heartbeat():
+                logger.error(f"Lost lease {self.lease.path.name}")
+                self.lost = True
+                return
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _move(path: Path, target_dir: Path) -> None:
+    try:
+        os.replace(path, target_dir / path.name)
+    except FileNotFoundError:
+        logger.warning(f"{path.name} was already moved by another worker")
+        return
+    sidecar = _sidecar(path)
+    try:
+        os.replace(sidecar, target_dir / sidecar.name)
+    except FileNotFoundError:
+        pass
+
+
+def prewarm() -> None:
+    """Import the pipeline and its heavy dependencies ahead of the first file."""
+    from . import pipeline  # noqa: F401
+
+
+def _process(path: Path, dirs: dict, policy: str, owned: Callable[[], bool]) -> None:
+    """Process a claimed file, publishing and moving it only while ``owned()`` holds."""
+    # Imported here so an idle worker, or the API importing ``enqueue``,
+    # does not load pandas
+    from .indicators import OverlapError
+    from .pipeline import detect_data_type, process_file, save_output
+
+    def abandon() -> None:
+        logger.warning(f"Lease on {path.name} was lost, leaving it to the worker that reclaimed it")
+
+    data_type = detect_data_type(path)
+    try:
+        # A policy given at upload time overrides the worker's
+        policy = _options(path).get("policy", policy)
+        processed_df = process_file(path, data_type, policy)
+        if not owned():
+            return abandon()
+        output_file = save_output(processed_df, data_type, path.stem)
+    except Exception as e:
+        if not owned():
+            return abandon()
+        # Bad input is the sender's to fix; anything else is a processing failure
+        if isinstance(e, (ValidationError, OverlapError)):
+            logger.warning(f"Rejected {path.name}: {str(e)}")
+            target = dirs["rejected"]
+        else:
+            logger.error(f"Failed to process {path.name}: {str(e)}")
+            target = dirs["failed"]
+        (target / f"{path.name}.error").write_text(f"{type(e).__name__}: {str(e)}\n")
+        _move(path, target)
+        return
+
+    if not owned():
+        return abandon()
+    logger.info(f"Processed {path.name} into {output_file}")
+    _move(path, dirs["done"])
+
+
+def process_next(
+    dirs: dict,
+    worker_id: str,
+    policy: str,
+    lease_ttl: float = DEFAULT_LEASE_TTL,
+    heartbeat: float = DEFAULT_HEARTBEAT,
+) -> bool:
+    """
+    Claim and process the oldest unclaimed file in the spool.
+
+    Returns:
+        True if a file was processed, False if there was nothing to claim
+    """
+    candidates = []
+    for path in dirs["incoming"].glob("*.csv"):
+        try:
+            candidates.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            # Finished by another worker while listing
+            continue
+
+    serial_seen = set()
+    for _, path in sorted(candidates):
+        # Same {type}_ prefix convention as detect_data_type, without pandas
+        data_type = path.name.split("_")[0].lower()
+        if data_type in SERIAL_TYPES:
+            if data_type in serial_seen:
+                continue
+            serial_seen.add(data_type)
+
+        lease = Lease.acquire(dirs["leases"], path.name, worker_id, lease_ttl)
+        if lease is None:
+            continue
+        if not path.exists():
+            # Finished by another worker between listing and claiming; the
+            # next file of a serial type is now the oldest
+            lease.release()
+            serial_seen.discard(data_type)
+            continue
+
+        logger.info(f"Worker {worker_id} claimed {path.name}")
+        beat = _Heartbeat(lease, heartbeat)
+        beat.start()
+        try:
+            _process(path, dirs, policy, lambda: not beat.lost and lease.owned())
+        finally:
+            beat.stop()
+            lease.release()
+        return True
+    return False
+
+
+def run_worker(
+    spool_dir: Optional[Path] = None,
+    worker_id: Optional[str] = None,
+    policy: Optional[str] = None,
+    lease_ttl: float = DEFAULT_LEASE_TTL,
+    heartbeat: float = DEFAULT_HEARTBEAT,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    once: bool = False,
+    warm: bool = False,
+) -> int:
+    """
+    Process spooled files until stopped.
+
+    Args:
+        spool_dir: Spool root, defaults to data/spool
+        worker_id: Identifier used in leases, defaults to host and PID
+        policy: Validation policy for files enqueued without one
+        lease_ttl: Seconds without a heartbeat before a lease is reclaimed
+        heartbeat: Seconds between heartbeats; must be well below ``lease_ttl``
+        poll_interval: Seconds to wait when the spool is empty
+        once: Exit when the spool is empty instead of polling
+        warm: Import the pipeline at startup rather than on the first file
+
+    Returns:
+        Number of files processed
+    """
+    if heartbeat >= lease_ttl:
+        raise ValueError("Heartbeat interval must be shorter than the lease TTL")
+
+    dirs = spool_dirs(spool_dir)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    policy = policy or DEFAULT_POLICY
+    if warm:
+        prewarm()
+    logger.info(f"Worker {worker_id} watching {dirs['incoming']}")
+
+    processed = 0
+    while True:
+        if process_next(dirs, worker_id, policy, lease_ttl, heartbeat):
+            processed += 1
+        elif once:
+            logger.info(f"Worker {worker_id} finished, processed {processed} file(s)")
+            return processed
+        else:
+            time.sleep(poll_interval)
+
+
+def main() -> None:
+    """Command-line entry point for pipeline workers."""
+    parser = argparse.ArgumentParser(description="Process raw files from a shared spool directory")
+    parser.add_argument("--spool", type=Path, default=None, help="Spool directory (default: data/spool)")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes to start")
+    parser.add_argument("--policy", default=None, choices=POLICIES,
+                        help="Validation policy for files enqueued without one")
+    parser.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL,
+                        help="Seconds without a heartbeat before a lease is reclaimed")
+    parser.add_argument("--heartbeat", type=float, default=DEFAULT_HEARTBEAT, help="Seconds between heartbeats")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds to wait when the spool is empty")
+    parser.add_argument("--once", action="store_true", help="Exit when the spool is empty")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Load the pipeline before polling so the first file starts immediately")
+    args = parser.parse_args()
+
+    configure_logging()
+    kwargs = dict(
+        spool_dir=args.spool,
+        policy=args.policy,
+        lease_ttl=args.lease_ttl,
+        heartbeat=args.heartbeat,
+        poll_interval=args.poll_interval,
+        once=args.once,
+        warm=args.prewarm,
+    )
+
+    if args.processes == 1:
+        run_worker(**kwargs)
+        return
+
+    # Children started with fork inherit the parent's imports
+    if args.prewarm:
+        prewarm()
+    processes = [multiprocessing.Process(target=run_worker, kwargs=kwargs) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()